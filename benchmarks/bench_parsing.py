@@ -0,0 +1,170 @@
+"""
+Event loop latency while documents are being parsed.
+
+Runs N parses at the same time, like N regents uploading scores at once,
+while a ticker task measures how late the event loop wakes it up. Three
+modes are compared:
+
+    inline   parse_file() called directly in a coroutine (the old behaviour)
+    thread   parse_file() in the default thread pool (still holds the GIL)
+    process  parse_file_async() (worker processes)
+
+Usage (from the repository root):
+
+    python benchmarks/bench_parsing.py --corpus ~/scores --parallel 8
+    python benchmarks/bench_parsing.py  # synthetic multi-page PDFs
+
+The process mode should keep the loop lag near the tick interval no
+matter how many parses run; inline and thread modes grow with the load.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_parser import get_file_type, parse_file, parse_file_async, shutdown_parse_pool  # noqa: E402
+
+TICK = 0.01  # Seconds between ticker wake-ups
+
+
+def make_pdf(pages: int, lines_per_page: int = 40) -> bytes:
+    """Build a plain text PDF with the given number of pages."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Page tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in range(pages):
+        lines = [f"Song title {page}"] + [
+            f"Line {line} of page {page}: la la la la la la la la la" for line in range(lines_per_page)
+        ]
+        stream = "BT /F1 10 Tf 14 TL 50 800 Td " + " ".join(f"({text}) '" for text in lines) + " ET"
+        stream = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def load_corpus(path: str) -> list[tuple[str, bytes]]:
+    """Read all PDF/DOCX files under a directory."""
+    corpus = []
+    for root, _, names in os.walk(path):
+        for name in sorted(names):
+            if get_file_type(name) in ("pdf", "docx"):
+                with open(os.path.join(root, name), "rb") as f:
+                    corpus.append((name, f.read()))
+    return corpus
+
+
+async def ticker(lags: list[float], stop: asyncio.Event):
+    """Record how much later than TICK the loop resumes this task."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+
+
+async def parse_inline(name: str, content: bytes):
+    return parse_file(content, name)
+
+
+async def parse_thread(name: str, content: bytes):
+    return await asyncio.get_running_loop().run_in_executor(None, parse_file, content, name)
+
+
+async def parse_process(name: str, content: bytes):
+    return await parse_file_async(content, name)
+
+
+MODES = {"inline": parse_inline, "thread": parse_thread, "process": parse_process}
+
+
+async def run_mode(mode: str, corpus: list[tuple[str, bytes]], parallel: int) -> dict:
+    """Parse every document of the corpus, parallel at a time, while the ticker runs."""
+    parse = MODES[mode]
+    if mode == "process":
+        await parse_process(*corpus[0])  # Start the workers outside the measurement
+
+    lags = []
+    stop = asyncio.Event()
+    tick_task = asyncio.create_task(ticker(lags, stop))
+    await asyncio.sleep(TICK * 2)
+
+    semaphore = asyncio.Semaphore(parallel)
+
+    async def one(name, content):
+        async with semaphore:
+            await parse(name, content)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(name, content) for name, content in corpus))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await tick_task
+
+    lags.sort()
+    return {
+        "mode": mode,
+        "docs_per_s": len(corpus) / elapsed,
+        "p50_ms": statistics.median(lags) * 1000,
+        "p99_ms": lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000,
+        "max_ms": lags[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--corpus", help="Directory with sample PDF/DOCX scores")
+    parser.add_argument("--parallel", type=int, default=8, help="Parses running at the same time")
+    parser.add_argument("--docs", type=int, default=32, help="Synthetic documents (without --corpus)")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per synthetic document")
+    parser.add_argument("--modes", default="inline,thread,process", help="Comma-separated modes to run")
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+        if not corpus:
+            parser.error(f"No PDF/DOCX files in {args.corpus}")
+    else:
+        pdf = make_pdf(args.pages)
+        corpus = [(f"synthetic_{i}.pdf", pdf) for i in range(args.docs)]
+
+    print(f"{len(corpus)} documents, {args.parallel} in parallel, tick {TICK * 1000:.0f} ms")
+    print(f"{'mode':<8} {'docs/s':>8} {'lag p50':>10} {'lag p99':>10} {'lag max':>10}")
+    try:
+        for mode in args.modes.split(","):
+            result = asyncio.run(run_mode(mode.strip(), corpus, args.parallel))
+            print(
+                f"{result['mode']:<8} {result['docs_per_s']:>8.1f} {result['p50_ms']:>8.1f}ms "
+                f"{result['p99_ms']:>8.1f}ms {result['max_ms']:>8.1f}ms"
+            )
+    finally:
+        shutdown_parse_pool()
+
+
+if __name__ == "__main__":
+    main()
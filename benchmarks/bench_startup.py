@@ -0,0 +1,97 @@
+"""
+Import time of the bot (everything that runs before run_polling).
+
+Imports a module in fresh interpreters with `python -X importtime` and
+reports the wall time, the cumulative import time of the heaviest
+packages, and whether the dependencies that should load lazily (Google
+API clients, PDF/DOCX parsers) were imported at startup.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --module bot --runs 10 --top 15
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages that are only needed after startup (background warm-up, parsing, Drive)
+DEFERRED = ("gspread", "google.oauth2", "google.auth.transport", "googleapiclient", "PyPDF2", "docx")
+
+# "import time: self [us] | cumulative | imported package"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_once(module: str) -> tuple[float, list[tuple[str, int, int]]]:
+    """
+    Import module in a new interpreter.
+
+    Returns:
+        Tuple of (wall seconds, [(package, cumulative_us, depth)])
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        sys.exit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    packages = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            packages.append((name, int(cumulative), len(indent) // 2))
+    return elapsed, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="bot", help="Module to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure")
+    parser.add_argument("--top", type=int, default=10, help="Heaviest imports to list")
+    args = parser.parse_args()
+
+    walls = []
+    totals = []
+    packages = []
+    for _ in range(args.runs):
+        wall, packages = import_once(args.module)
+        walls.append(wall)
+        totals.append(sum(cumulative for _, cumulative, depth in packages if depth == 0))
+
+    print(f"import {args.module}: {args.runs} runs")
+    print(f"  wall time       median {statistics.median(walls) * 1000:7.1f} ms   min {min(walls) * 1000:7.1f} ms")
+    print(f"  import time     median {statistics.median(totals) / 1000:7.1f} ms   min {min(totals) / 1000:7.1f} ms")
+
+    # The module itself is one top-level entry; what it pulls in sits one level below
+    print("\nHeaviest imports (last run, cumulative):")
+    heaviest = sorted(
+        ((name, cumulative) for name, cumulative, depth in packages if depth <= 1 and name != args.module),
+        key=lambda item: item[1],
+        reverse=True
+    )
+    for name, cumulative in heaviest[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    imported = {name for name, _, _ in packages}
+    loaded = [
+        prefix for prefix in DEFERRED
+        if any(name == prefix or name.startswith(prefix + ".") for name in imported)
+    ]
+    print(f"\nDeferred dependencies loaded at startup: {', '.join(loaded) if loaded else 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,10 +15,28 @@ from telegram.ext import (
     CallbackQueryHandler,
     ConversationHandler,
     filters,
-    PicklePersistence,
 )
 
-from config import TELEGRAM_TOKEN, CHIEF_REGENT_ID, ADMIN_IDS, validate_config
+from config import (
+    TELEGRAM_TOKEN,
+    CHIEF_REGENT_ID,
+    ADMIN_IDS,
+    BOT_MODE,
+    WEBHOOK_URL,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET_TOKEN,
+    PERSISTENCE_FILE,
+    LEGACY_PERSISTENCE_FILE,
+    validate_config,
+)
+from sqlite_persistence import SQLitePersistence
+from drive_client import stop_drive_archiver
+from file_parser import shutdown_parse_pool
+from repertoire_list import flush_repertoire_updates
+from sheets_client import flush_sheets_mirror
+from warmup import start_warm_up
 from handlers.common import (
     start_command, 
     help_command, 
@@ -52,9 +70,17 @@ from handlers.admin import (
     handle_clarify_question,
     handle_reject_reason,
     invite_command,
+    review_command,
+    handle_review_callback,
     WAITING_CLARIFY_QUESTION,
     WAITING_REJECT_REASON,
 )
+from handlers.importer import (
+    import_command,
+    handle_import_file,
+    handle_import_done,
+    WAITING_IMPORT_FILES,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -63,6 +89,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Update types the handlers below react to (messages, commands, documents and
+# inline buttons); Telegram does not send anything else
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
 
 def main():
     """Start the bot."""
@@ -74,7 +104,10 @@ def main():
         return
     
     # Create persistence object
-    persistence = PicklePersistence(filepath="bot_data.pickle")
+    persistence = SQLitePersistence(
+        filepath=PERSISTENCE_FILE,
+        legacy_pickle_path=LEGACY_PERSISTENCE_FILE
+    )
     
     # Create application with persistence
     application = Application.builder().token(TELEGRAM_TOKEN).persistence(persistence).build()
@@ -193,6 +226,26 @@ def main():
         persistent=True,
     )
     
+    # Conversation handler for bulk import of a repertoire archive (admin)
+    import_conv_handler = ConversationHandler(
+        entry_points=[
+            CommandHandler("import", import_command, filters=filters.User(ADMIN_IDS))
+        ],
+        states={
+            WAITING_IMPORT_FILES: [
+                MessageHandler(filters.Document.ALL & filters.User(ADMIN_IDS), handle_import_file),
+                CommandHandler("done", handle_import_done),
+            ],
+        },
+        fallbacks=[
+            CommandHandler("cancel", cancel_command)
+        ],
+        per_user=True,
+        per_chat=True,
+        name="repertoire_import",
+        persistent=True,
+    )
+    
     # Global handler for clarification answers from regents
     clarify_answer_handler = MessageHandler(
         filters.TEXT & ~filters.COMMAND & ~filters.User(ADMIN_IDS),
@@ -204,6 +257,9 @@ def main():
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("repertoire", repertoire_command))
     application.add_handler(CommandHandler("invite", invite_command))
+    application.add_handler(CommandHandler("review", review_command))
+    application.add_handler(CallbackQueryHandler(handle_review_callback, pattern="^review_"))
+    application.add_handler(import_conv_handler)  # Before admin_conv_handler, which takes admin documents
     application.add_handler(admin_conv_handler)  # Admin FIRST to catch admin documents
     application.add_handler(document_conv_handler)
     application.add_handler(clarify_answer_handler)  # For regent clarification answers
@@ -212,6 +268,15 @@ def main():
     async def post_init(app):
         from telegram import BotCommand, BotCommandScopeChat
         
+        # Older versions kept uploaded files in user_data - drop them from persistence
+        stale_user_ids = [
+            user_id for user_id, data in app.user_data.items()
+            if data.pop("file_bytes", None) is not None
+        ]
+        if stale_user_ids:
+            app.mark_data_for_update_persistence(user_ids=stale_user_ids)
+            logger.info(f"Removed stored file contents for {len(stale_user_ids)} users")
+        
         # Commands for regular users
         commands = [
             BotCommand("start", "🔄 Перезавантажити"),
@@ -220,10 +285,12 @@ def main():
         ]
         await app.bot.set_my_commands(commands)
         
-        # Admin commands (includes /invite)
+        # Admin commands (includes /invite, /review and /import)
         admin_commands = [
             BotCommand("start", "🔄 Перезавантажити"),
             BotCommand("invite", "🔗 Створити запрошення"),
+            BotCommand("review", "📋 Розглянути заявки"),
+            BotCommand("import", "📦 Імпорт архіву пісень"),
             BotCommand("help", "❓ Допомога"),
             BotCommand("cancel", "❌ Скасувати дію"),
         ]
@@ -235,15 +302,40 @@ def main():
                 )
             except Exception as e:
                 logger.warning(f"Could not set admin commands for {admin_id}: {e}")
+        
+        # Local store, Google Sheets, Drive and caches warm up concurrently in the
+        # background; handlers wait for the store with warmup.wait_until_ready()
+        start_warm_up(app.bot)
     
     application.post_init = post_init
     
+    # Publish a pending repertoire list update and queued Sheets writes before the bot goes offline
+    async def post_stop(app):
+        await stop_drive_archiver()
+        await flush_repertoire_updates()
+        await flush_sheets_mirror()
+        shutdown_parse_pool()
+    
+    application.post_stop = post_stop
+    
     # Log startup
-    logger.info("Bot is starting...")
+    logger.info(f"Bot is starting ({BOT_MODE})...")
     logger.info(f"Chief Regent ID: {CHIEF_REGENT_ID}")
     
-    # Start polling
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if BOT_MODE == "webhook":
+        # Telegram posts updates to WEBHOOK_URL/WEBHOOK_PATH; requests without
+        # the secret token header are rejected by the built-in server
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET_TOKEN,
+            allowed_updates=ALLOWED_UPDATES,
+        )
+    else:
+        # Start polling
+        application.run_polling(allowed_updates=ALLOWED_UPDATES)
 
 
 if __name__ == "__main__":
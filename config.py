@@ -4,6 +4,7 @@ Loads settings from environment variables.
 """
 
 import os
+import re
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -15,10 +16,52 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 CHIEF_REGENT_ID = int(os.getenv("CHIEF_REGENT_ID", "0"))
 ADMIN_IDS = [CHIEF_REGENT_ID]
 
+# Update delivery: "polling" (default) or "webhook" (Telegram calls our HTTP server)
+BOT_MODE = os.getenv("BOT_MODE", "polling").strip().lower()
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # Public HTTPS base URL, e.g. https://bot.example.com
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")  # Local address of the HTTP server
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram").strip("/")  # URL path the updates are posted to
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN", "")  # Checked on every request (X-Telegram-Bot-Api-Secret-Token)
+
 # Google Sheets Settings
 GOOGLE_SHEET_ID = os.getenv("GOOGLE_SHEET_ID")
 GOOGLE_CREDENTIALS_FILE = os.getenv("GOOGLE_CREDENTIALS_FILE", "credentials.json")
-GOOGLE_DRIVE_FOLDER_ID = os.getenv("GOOGLE_DRIVE_FOLDER_ID", "")  # Optional - for file uploads
+GOOGLE_DRIVE_FOLDER_ID = os.getenv("GOOGLE_DRIVE_FOLDER_ID", "")  # Optional - approved songs are archived there
+GOOGLE_HTTP_POOL_SIZE = int(os.getenv("GOOGLE_HTTP_POOL_SIZE", "10"))  # Keep-alive connections to Google APIs
+TOKEN_REFRESH_MARGIN = float(os.getenv("TOKEN_REFRESH_MARGIN", "300"))  # Seconds before expiry to refresh the access token
+
+# Drive archive (background uploads of approved songs)
+DRIVE_MAX_WORKERS = int(os.getenv("DRIVE_MAX_WORKERS", "3"))  # Uploads running at the same time
+DRIVE_RESUMABLE_THRESHOLD = int(os.getenv("DRIVE_RESUMABLE_THRESHOLD", str(5 * 1024 * 1024)))  # Bytes; larger files use resumable uploads
+DRIVE_CHUNK_SIZE = int(os.getenv("DRIVE_CHUNK_SIZE", str(5 * 1024 * 1024)))  # Bytes per resumable chunk (multiple of 256 KB)
+DRIVE_POLL_INTERVAL = float(os.getenv("DRIVE_POLL_INTERVAL", "30"))  # Seconds between checks of the upload queue
+DRIVE_MAX_ATTEMPTS = int(os.getenv("DRIVE_MAX_ATTEMPTS", "5"))  # Failed attempts before a file is given up
+
+# Async Sheets access (blocking gspread calls run in a bounded thread pool)
+SHEETS_MAX_WORKERS = int(os.getenv("SHEETS_MAX_WORKERS", "4"))
+SHEETS_CALL_TIMEOUT = float(os.getenv("SHEETS_CALL_TIMEOUT", "20"))  # Seconds per call
+SHEETS_CONNECT_TIMEOUT = float(os.getenv("SHEETS_CONNECT_TIMEOUT", "60"))  # Seconds for connect()
+SHEETS_POLL_INTERVAL = float(os.getenv("SHEETS_POLL_INTERVAL", "60"))  # Seconds between checks for manual Sheets edits
+SHEETS_READS_PER_MINUTE = float(os.getenv("SHEETS_READS_PER_MINUTE", "60"))  # Read quota per user
+SHEETS_WRITES_PER_MINUTE = float(os.getenv("SHEETS_WRITES_PER_MINUTE", "60"))  # Write quota per user
+SHEETS_MAX_RETRIES = int(os.getenv("SHEETS_MAX_RETRIES", "5"))  # Retries on 429 (and 5xx for reads) before giving up
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))  # Seconds a regent lookup is trusted
+WARMUP_WAIT_TIMEOUT = float(os.getenv("WARMUP_WAIT_TIMEOUT", "30"))  # Seconds a handler waits for startup warm-up
+
+# Local store (system of record); Google Sheets is mirrored from it in the background
+LOCAL_STORE_FILE = os.getenv("LOCAL_STORE_FILE", "choir_data.sqlite3")
+SHEETS_MIRROR_DELAY = float(os.getenv("SHEETS_MIRROR_DELAY", "2"))  # Seconds to coalesce Sheets writes
+
+# Bot state persistence (SQLite); the old pickle is imported once if present
+PERSISTENCE_FILE = os.getenv("PERSISTENCE_FILE", "bot_data.sqlite3")
+LEGACY_PERSISTENCE_FILE = os.getenv("LEGACY_PERSISTENCE_FILE", "bot_data.pickle")
+
+# Document parsing (runs in a pool of worker processes)
+PARSE_MAX_WORKERS = int(os.getenv("PARSE_MAX_WORKERS", "2"))
+PARSE_TIMEOUT = float(os.getenv("PARSE_TIMEOUT", "10"))  # Seconds per document
+PARSE_MEMORY_LIMIT_MB = int(os.getenv("PARSE_MEMORY_LIMIT_MB", "512"))  # Address space per worker
+PARSE_MAX_TASKS_PER_CHILD = int(os.getenv("PARSE_MAX_TASKS_PER_CHILD", "50"))  # Worker recycling (Python 3.11+)
 
 # Telegram Storage Channel (for permanent file links)
 STORAGE_CHANNEL_ID = os.getenv("STORAGE_CHANNEL_ID", "")  # Channel ID or @username
@@ -26,6 +69,7 @@ STORAGE_CHANNEL_ID = os.getenv("STORAGE_CHANNEL_ID", "")  # Channel ID or @usern
 # Repertoire list in group (auto-updating pinned message)
 REPERTOIRE_GROUP_ID = os.getenv("REPERTOIRE_GROUP_ID", "")  # Group/channel for list
 REPERTOIRE_MESSAGE_ID = os.getenv("REPERTOIRE_MESSAGE_ID", "")  # Message ID to edit
+REPERTOIRE_UPDATE_DELAY = float(os.getenv("REPERTOIRE_UPDATE_DELAY", "5"))  # Seconds to coalesce list updates
 
 # Sheet names
 SHEET_REPERTOIRE = "Репертуар"
@@ -56,6 +100,17 @@ def validate_config():
     if not os.path.exists(GOOGLE_CREDENTIALS_FILE):
         errors.append(f"Google credentials file not found: {GOOGLE_CREDENTIALS_FILE}")
     
+    if BOT_MODE not in ("polling", "webhook"):
+        errors.append(f"BOT_MODE must be 'polling' or 'webhook', not '{BOT_MODE}'")
+    
+    if BOT_MODE == "webhook":
+        if not WEBHOOK_URL.startswith("https://"):
+            errors.append("WEBHOOK_URL must be set to a public https:// URL in webhook mode")
+        if not WEBHOOK_SECRET_TOKEN:
+            errors.append("WEBHOOK_SECRET_TOKEN is not set (required in webhook mode)")
+        elif not re.fullmatch(r"[A-Za-z0-9_-]{1,256}", WEBHOOK_SECRET_TOKEN):
+            errors.append("WEBHOOK_SECRET_TOKEN may only contain A-Z, a-z, 0-9, _ and - (up to 256 characters)")
+    
     if errors:
         raise ValueError("Configuration errors:\n" + "\n".join(f"  - {e}" for e in errors))
 
@@ -1,109 +1,330 @@
 """
-Google Drive client for uploading files.
+Google Drive client for archiving song files.
+
+Approved songs are queued in the local store (drive_uploads table) and
+archived by DriveArchiver in the background, so handlers never wait for
+Drive. Small files are sent with one multipart request, larger ones with
+a chunked resumable upload; the "anyone with the link" permissions of a
+round of uploads are granted in one batch request.
+
+googleapiclient is imported on the first upload, not at bot startup.
 """
 
+import asyncio
 import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
-from google.oauth2.service_account import Credentials
+from telegram import Bot
+
+from config import (
+    GOOGLE_DRIVE_FOLDER_ID,
+    DRIVE_MAX_WORKERS,
+    DRIVE_RESUMABLE_THRESHOLD,
+    DRIVE_CHUNK_SIZE,
+    DRIVE_POLL_INTERVAL,
+    DRIVE_MAX_ATTEMPTS,
+)
+from google_auth import get_credentials, get_authorized_http
+from local_store import LocalStore
+
+# Requests per Drive batch call (API limit is 100)
+DRIVE_BATCH_LIMIT = 100
+
+# Characters kept in Drive file names besides letters and digits
+SAFE_TITLE_CHARS = (" ", "-", "_")
+
+PDF_MIME_TYPE = "application/pdf"
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def detect_file_type(file_bytes: bytes, filename: str = "") -> tuple[str, str]:
+    """
+    Get the MIME type and extension of a song file.
+
+    The queue only keeps Telegram file IDs, so the type is taken from the
+    content (PDF and DOCX signatures) when there is no file name.
+
+    Returns:
+        Tuple of (mime_type, extension)
+    """
+    lower_name = filename.lower()
+    if lower_name.endswith(".pdf") or file_bytes.startswith(b"%PDF"):
+        return PDF_MIME_TYPE, ".pdf"
+    if lower_name.endswith(".docx") or file_bytes.startswith(b"PK\x03\x04"):
+        return DOCX_MIME_TYPE, ".docx"
+    return "application/octet-stream", ""
 
-from config import GOOGLE_CREDENTIALS_FILE, GOOGLE_DRIVE_FOLDER_ID
 
-# Google API scopes
-SCOPES = [
-    "https://www.googleapis.com/auth/drive.file"
-]
+def safe_file_title(title: str) -> str:
+    """Strip characters Drive users would not expect in a file name."""
+    return "".join(c for c in title if c.isalnum() or c in SAFE_TITLE_CHARS).strip()[:100]
 
 
 class DriveClient:
-    """Client for uploading files to Google Drive (using shared folder)."""
-    
+    """Client for uploading files to Google Drive (using shared folder), thread-safe."""
+
     def __init__(self):
         """Initialize the Drive client."""
-        self._service = None
         self._folder_id = None
-    
+        self._local = threading.local()  # API client per thread (httplib2 is not thread-safe)
+
+    @property
+    def is_enabled(self) -> bool:
+        """Whether uploads are configured."""
+        return bool(self._folder_id)
+
     def connect(self):
         """Establish connection to Google Drive."""
         if not GOOGLE_DRIVE_FOLDER_ID:
             print("Warning: GOOGLE_DRIVE_FOLDER_ID not set. File uploads disabled.")
             return
-        
-        credentials = Credentials.from_service_account_file(
-            GOOGLE_CREDENTIALS_FILE,
-            scopes=SCOPES
-        )
-        self._service = build('drive', 'v3', credentials=credentials)
+
+        get_credentials()  # Shared with the Sheets client (see google_auth.py)
         self._folder_id = GOOGLE_DRIVE_FOLDER_ID
-    
-    def upload_file(self, file_bytes: bytes, filename: str, title: str) -> Optional[str]:
+
+    def _service(self):
+        """Get the API client of the current thread."""
+        service = getattr(self._local, "service", None)
+        if service is None:
+            from googleapiclient.discovery import build
+
+            service = build("drive", "v3", http=get_authorized_http(), cache_discovery=False)
+            self._local.service = service
+        return service
+
+    def upload_file(self, file_bytes: bytes, filename: str, title: str) -> Optional[dict]:
         """
-        Upload a file to Google Drive.
-        
+        Upload a file to Google Drive (it is not shared yet, see grant_read_access()).
+
+        Files up to DRIVE_RESUMABLE_THRESHOLD bytes go in one multipart
+        request; larger files are sent in DRIVE_CHUNK_SIZE chunks that are
+        retried individually.
+
         Args:
             file_bytes: File content as bytes
-            filename: Original filename (for extension)
+            filename: Original filename (for extension, may be empty)
             title: Song title (for naming the file)
-            
+
         Returns:
-            URL to the file or None on error
+            Dict with "id" and "webViewLink", or None on error
         """
-        if not self._folder_id or not self._service:
+        if not self.is_enabled:
             return None
-        
+
+        from googleapiclient.http import MediaIoBaseUpload
+
         try:
-            # Determine mime type
-            if filename.lower().endswith('.pdf'):
-                mime_type = 'application/pdf'
-                ext = '.pdf'
-            elif filename.lower().endswith('.docx'):
-                mime_type = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-                ext = '.docx'
-            else:
-                mime_type = 'application/octet-stream'
-                ext = ''
-            
-            # Clean title for filename
-            safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_', 'а', 'б', 'в', 'г', 'д', 'е', 'є', 'ж', 'з', 'и', 'і', 'ї', 'й', 'к', 'л', 'м', 'н', 'о', 'п', 'р', 'с', 'т', 'у', 'ф', 'х', 'ц', 'ч', 'ш', 'щ', 'ь', 'ю', 'я', 'А', 'Б', 'В', 'Г', 'Д', 'Е', 'Є', 'Ж', 'З', 'И', 'І', 'Ї', 'Й', 'К', 'Л', 'М', 'Н', 'О', 'П', 'Р', 'С', 'Т', 'У', 'Ф', 'Х', 'Ц', 'Ч', 'Ш', 'Щ', 'Ь', 'Ю', 'Я')).strip()
-            safe_title = safe_title[:100]  # Limit length
-            
+            mime_type, ext = detect_file_type(file_bytes, filename)
             file_metadata = {
-                'name': f"{safe_title}{ext}",
-                'parents': [self._folder_id]
+                "name": f"{safe_file_title(title)}{ext}",
+                "parents": [self._folder_id]
             }
-            
+
+            resumable = len(file_bytes) > DRIVE_RESUMABLE_THRESHOLD
             media = MediaIoBaseUpload(
                 io.BytesIO(file_bytes),
                 mimetype=mime_type,
-                resumable=True
+                chunksize=DRIVE_CHUNK_SIZE,
+                resumable=resumable
             )
-            
+
             # Use supportsAllDrives to work with shared folders
-            file = self._service.files().create(
+            request = self._service().files().create(
                 body=file_metadata,
                 media_body=media,
-                fields='id, webViewLink',
+                fields="id, webViewLink",
                 supportsAllDrives=True
-            ).execute()
-            
-            # Make file accessible by anyone with link
-            self._service.permissions().create(
-                fileId=file['id'],
-                body={'type': 'anyone', 'role': 'reader'},
-                supportsAllDrives=True
-            ).execute()
-            
-            return file.get('webViewLink')
-            
+            )
+            if not resumable:
+                return request.execute(num_retries=3)
+
+            response = None
+            while response is None:
+                _, response = request.next_chunk(num_retries=3)
+            return response
+
         except Exception as e:
             print(f"Error uploading file to Drive: {e}")
             return None
 
+    def grant_read_access(self, file_ids: list[str]) -> set[str]:
+        """
+        Make files accessible by anyone with the link, in batch requests.
+
+        Args:
+            file_ids: Drive file IDs
+
+        Returns:
+            IDs of the files that were shared
+        """
+        if not self.is_enabled or not file_ids:
+            return set()
+
+        shared = set()
 
-# Singleton instance
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                print(f"Error sharing Drive file {request_id}: {exception}")
+            else:
+                shared.add(request_id)
+
+        service = self._service()
+        for start in range(0, len(file_ids), DRIVE_BATCH_LIMIT):
+            batch = service.new_batch_http_request(callback=on_response)
+            for file_id in file_ids[start:start + DRIVE_BATCH_LIMIT]:
+                batch.add(
+                    service.permissions().create(
+                        fileId=file_id,
+                        body={"type": "anyone", "role": "reader"},
+                        fields="id",
+                        supportsAllDrives=True
+                    ),
+                    request_id=file_id
+                )
+            try:
+                batch.execute()
+            except Exception as e:
+                print(f"Error sharing Drive files: {e}")
+        return shared
+
+
+class DriveArchiver:
+    """
+    Background task that archives queued song files to Google Drive.
+
+    Every DRIVE_POLL_INTERVAL seconds the queued files are downloaded from
+    Telegram and uploaded by a pool of max_workers threads, then shared
+    with one batch request. The queue lives in the local store, so uploads
+    interrupted by a restart are picked up again; failed files are retried
+    at the next interval and given up after DRIVE_MAX_ATTEMPTS failures.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        store: LocalStore,
+        drive: DriveClient,
+        max_workers: int = DRIVE_MAX_WORKERS,
+        interval: float = DRIVE_POLL_INTERVAL
+    ):
+        """
+        Create the archiver (call start() to run it).
+
+        Args:
+            bot: Bot used to download the files
+            store: Local store with the drive_uploads queue
+            drive: Connected Drive client
+            max_workers: Uploads running at the same time
+            interval: Seconds between checks of the queue
+        """
+        self._bot = bot
+        self._store = store
+        self._drive = drive
+        self._max_workers = max_workers
+        self._interval = interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="drive")
+        self._dirty = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def mark_dirty(self):
+        """Check the queue now instead of at the next interval."""
+        self._dirty.set()
+
+    async def _run(self):
+        """Process the queue whenever marked dirty or the interval passes, while it makes progress."""
+        while True:
+            try:
+                await asyncio.wait_for(self._dirty.wait(), timeout=self._interval)
+            except asyncio.TimeoutError:
+                pass
+            self._dirty.clear()
+
+            try:
+                while await self.process_pending():
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error archiving songs to Drive: {e}")
+
+    async def process_pending(self) -> int:
+        """
+        Upload and share one round of queued files.
+
+        Returns:
+            Number of files archived (0 when the queue is empty or nothing succeeded)
+        """
+        jobs = self._store.drive_uploads("queued", limit=self._max_workers * 4)
+        semaphore = asyncio.Semaphore(self._max_workers)
+
+        async def upload(job):
+            async with semaphore:
+                await self._upload(job)
+
+        await asyncio.gather(*(upload(job) for job in jobs))
+        return await self._share_uploaded()
+
+    async def _upload(self, job: tuple):
+        """Download one queued file from Telegram and upload it to Drive."""
+        seq, request_id, file_id, title, *_ = job
+        loop = asyncio.get_running_loop()
+        error = "upload failed"
+        result = None
+        try:
+            file = await self._bot.get_file(file_id)
+            content = bytes(await file.download_as_bytearray())
+            result = await loop.run_in_executor(self._executor, self._drive.upload_file, content, "", title)
+        except Exception as e:
+            print(f"Error archiving request {request_id} to Drive: {e}")
+            error = str(e)
+
+        if result and result.get("id"):
+            self._store.mark_drive_uploaded(seq, result["id"], result.get("webViewLink") or "")
+        else:
+            self._store.mark_drive_failed(seq, error, DRIVE_MAX_ATTEMPTS)
+
+    async def _share_uploaded(self) -> int:
+        """Grant link access to everything uploaded but not shared yet; returns the number shared."""
+        uploaded = self._store.drive_uploads("uploaded", limit=DRIVE_BATCH_LIMIT * 5)
+        if not uploaded:
+            return 0
+        loop = asyncio.get_running_loop()
+        shared = await loop.run_in_executor(
+            self._executor,
+            self._drive.grant_read_access,
+            [drive_file_id for _, _, _, _, drive_file_id, _, _ in uploaded]
+        )
+        done = []
+        for seq, request_id, _, _, drive_file_id, link, _ in uploaded:
+            if drive_file_id in shared:
+                done.append((seq, request_id, link))
+            else:
+                self._store.mark_drive_failed(seq, "sharing failed", DRIVE_MAX_ATTEMPTS)
+        self._store.finish_drive_uploads(done)
+        return len(done)
+
+    async def stop(self):
+        """Stop the background task (the queue is kept for the next start)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instances
 _drive_client = None
+_drive_archiver = None
 
 
 def get_drive_client() -> DriveClient:
@@ -113,3 +334,24 @@ def get_drive_client() -> DriveClient:
         _drive_client = DriveClient()
         _drive_client.connect()
     return _drive_client
+
+
+def start_drive_archiver(bot: Bot, store: LocalStore) -> Optional[DriveArchiver]:
+    """Start archiving queued songs to Drive (does nothing without GOOGLE_DRIVE_FOLDER_ID)."""
+    global _drive_archiver
+    if _drive_archiver is None:
+        drive = get_drive_client()
+        if not drive.is_enabled:
+            return None
+        _drive_archiver = DriveArchiver(bot, store, drive)
+    _drive_archiver.start()
+    _drive_archiver.mark_dirty()  # Resume uploads left from the last run
+    return _drive_archiver
+
+
+async def stop_drive_archiver():
+    """Stop the Drive archiver (call on shutdown)."""
+    global _drive_archiver
+    if _drive_archiver is not None:
+        await _drive_archiver.stop()
+        _drive_archiver = None
@@ -1,13 +1,38 @@
 """
 File parser module for extracting text from PDF and DOCX files.
+
+Parsing is CPU-bound, so the bot calls the async wrappers at the end of
+this module (parse_file_async, parse_title_async), which run the parsers
+in a pool of worker processes with a timeout and a memory limit.
+
+PyPDF2 and python-docx are imported by the parsers on first use, so the
+bot process (which only needs normalize_title/get_file_type) never loads
+them.
 """
 
+import asyncio
 import io
 import re
-from typing import Optional
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from itertools import islice
+from multiprocessing.context import SpawnContext, SpawnProcess
+from typing import Iterable, Iterator, Optional
 
-from PyPDF2 import PdfReader
-from docx import Document
+from config import (
+    PARSE_MAX_WORKERS,
+    PARSE_TIMEOUT,
+    PARSE_MEMORY_LIMIT_MB,
+    PARSE_MAX_TASKS_PER_CHILD,
+)
+
+# Title extraction only looks at the start of a document
+TITLE_MAX_PAGES = 1  # PDF pages read
+TITLE_MAX_LINES = 30  # Lines (or DOCX paragraphs) examined
+TITLE_MAX_FILE_SIZE = 20 * 1024 * 1024  # Larger files are not parsed for a title
 
 
 def extract_text_from_pdf(file_bytes: bytes) -> str:
@@ -20,6 +45,8 @@ def extract_text_from_pdf(file_bytes: bytes) -> str:
     Returns:
         Extracted text as string
     """
+    from PyPDF2 import PdfReader
+
     try:
         pdf_file = io.BytesIO(file_bytes)
         reader = PdfReader(pdf_file)
@@ -46,6 +73,8 @@ def extract_text_from_docx(file_bytes: bytes) -> str:
     Returns:
         Extracted text as string
     """
+    from docx import Document
+
     try:
         docx_file = io.BytesIO(file_bytes)
         doc = Document(docx_file)
@@ -61,6 +90,47 @@ def extract_text_from_docx(file_bytes: bytes) -> str:
         return ""
 
 
+def iter_pdf_lines(file_bytes: bytes, max_pages: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield text lines of a PDF page by page.
+    
+    Pages are only decoded when the consumer asks for more lines, so
+    stopping early skips the rest of the document.
+    
+    Args:
+        file_bytes: PDF file content as bytes
+        max_pages: Stop after this many pages (None for all)
+    """
+    from PyPDF2 import PdfReader
+
+    try:
+        reader = PdfReader(io.BytesIO(file_bytes))
+        for page in islice(reader.pages, max_pages):
+            page_text = page.extract_text()
+            if page_text:
+                yield from page_text.split("\n")
+    except Exception as e:
+        print(f"Error extracting text from PDF: {e}")
+
+
+def iter_docx_lines(file_bytes: bytes) -> Iterator[str]:
+    """
+    Yield the non-empty paragraphs of a DOCX file.
+    
+    Args:
+        file_bytes: DOCX file content as bytes
+    """
+    from docx import Document
+
+    try:
+        doc = Document(io.BytesIO(file_bytes))
+        for paragraph in doc.paragraphs:
+            if paragraph.text.strip():
+                yield paragraph.text
+    except Exception as e:
+        print(f"Error extracting text from DOCX: {e}")
+
+
 def extract_title(text: str) -> Optional[str]:
     """
     Extract the song title from text.
@@ -75,8 +145,19 @@ def extract_title(text: str) -> Optional[str]:
     if not text:
         return None
     
-    lines = text.strip().split("\n")
+    return extract_title_from_lines(text.strip().split("\n"))
+
+
+def extract_title_from_lines(lines: Iterable[str]) -> Optional[str]:
+    """
+    Get the first meaningful line; stops consuming lines as soon as it is found.
     
+    Args:
+        lines: Text lines (may be a lazy generator)
+        
+    Returns:
+        Extracted title or None if not found
+    """
     for line in lines:
         # Clean the line
         clean_line = line.strip()
@@ -183,3 +264,184 @@ def parse_file(file_bytes: bytes, filename: str) -> tuple[Optional[str], Optiona
     title = extract_title(text)
     
     return text, title
+
+
+def parse_title(
+    file_bytes: bytes,
+    filename: str,
+    max_pages: int = TITLE_MAX_PAGES,
+    max_lines: int = TITLE_MAX_LINES
+) -> Optional[str]:
+    """
+    Extract only the title of a file, reading as little of it as possible.
+    
+    Unlike parse_file(), which returns the full text, this decodes at most
+    max_pages PDF pages and examines at most max_lines lines. Files larger
+    than TITLE_MAX_FILE_SIZE are not parsed.
+    
+    Args:
+        file_bytes: File content as bytes
+        filename: Name of the file
+        max_pages: PDF pages to read
+        max_lines: Lines to examine
+        
+    Returns:
+        Suggested title or None
+    """
+    if len(file_bytes) > TITLE_MAX_FILE_SIZE:
+        return None
+    
+    file_type = get_file_type(filename)
+    
+    if file_type == "pdf":
+        lines = iter_pdf_lines(file_bytes, max_pages=max_pages)
+    elif file_type == "docx":
+        lines = iter_docx_lines(file_bytes)
+    else:
+        return None
+    
+    return extract_title_from_lines(islice(lines, max_lines))
+
+
+# --- Parsing service (worker processes) ---
+
+_parse_pool = None
+_parse_context = None  # Context the pool's processes were started from
+_parse_pool_lock = threading.Lock()
+_parse_slots = None  # Semaphore: jobs beyond the worker count wait here, outside the timeout
+
+
+def _init_parse_worker(memory_limit_mb: int):
+    """Limit the address space of a parser process (Unix only)."""
+    try:
+        import resource
+    except ImportError:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError) as e:
+        print(f"Could not limit parser memory: {e}")
+
+
+class _ParseContext(SpawnContext):
+    """
+    Spawn context that remembers the processes it started.
+
+    Workers are always spawned (never forked from the threaded bot process),
+    so each one imports the main module afresh; bot.py only starts the bot
+    under `if __name__ == "__main__"`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.processes: list[SpawnProcess] = []
+
+    def Process(self, *args, **kwargs) -> SpawnProcess:
+        process = SpawnProcess(*args, **kwargs)
+        # Forget workers that already exited (recycled after max_tasks_per_child)
+        self.processes = [p for p in self.processes if p.exitcode is None]
+        self.processes.append(process)
+        return process
+
+
+def _get_parse_pool() -> tuple[ProcessPoolExecutor, _ParseContext]:
+    """Get or create the pool of parser processes (with the context that tracks them)."""
+    global _parse_pool, _parse_context
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_context = _ParseContext()
+            options = {}
+            if sys.version_info >= (3, 11):
+                options["max_tasks_per_child"] = PARSE_MAX_TASKS_PER_CHILD  # Recycle workers (fresh memory)
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=PARSE_MAX_WORKERS,
+                mp_context=_parse_context,
+                initializer=_init_parse_worker,
+                initargs=(PARSE_MEMORY_LIMIT_MB,),
+                **options,
+            )
+        return _parse_pool, _parse_context
+
+
+def _reset_parse_pool(pool: ProcessPoolExecutor, context: _ParseContext):
+    """Kill the workers of a pool (a job hung or crashed); the next call starts a new pool."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is pool:
+            _parse_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+    # A stuck parser never returns, so its process has to be terminated
+    for process in context.processes:
+        if process.is_alive():
+            process.terminate()
+
+
+async def _run_in_parse_pool(func, *args, timeout: float):
+    """
+    Run a parser in a worker process.
+    
+    Raises:
+        asyncio.TimeoutError: The job took longer than timeout (its worker is killed)
+        BrokenProcessPool: A worker died, e.g. when it hit the memory limit
+    """
+    global _parse_slots
+    if _parse_slots is None:
+        _parse_slots = asyncio.Semaphore(PARSE_MAX_WORKERS)
+    
+    async with _parse_slots:
+        pool, context = _get_parse_pool()
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(pool, partial(func, *args)), timeout=timeout)
+        except (asyncio.TimeoutError, BrokenProcessPool):
+            _reset_parse_pool(pool, context)
+            raise
+
+
+async def parse_file_async(
+    file_bytes: bytes,
+    filename: str,
+    timeout: float = PARSE_TIMEOUT
+) -> tuple[Optional[str], Optional[str]]:
+    """
+    Awaitable parse_file() that runs in a worker process.
+    
+    A document that takes longer than timeout or exhausts the worker's
+    memory is given up on, as if it had no text.
+    
+    Returns:
+        Tuple of (extracted_text, suggested_title)
+    """
+    try:
+        return await _run_in_parse_pool(parse_file, file_bytes, filename, timeout=timeout)
+    except (asyncio.TimeoutError, BrokenProcessPool) as e:
+        print(f"Error parsing {filename}: {type(e).__name__}")
+        return None, None
+
+
+async def parse_title_async(
+    file_bytes: bytes,
+    filename: str,
+    timeout: float = PARSE_TIMEOUT
+) -> Optional[str]:
+    """
+    Awaitable parse_title() that runs in a worker process.
+    
+    Returns:
+        Suggested title or None (also on timeout or worker failure)
+    """
+    try:
+        return await _run_in_parse_pool(parse_title, file_bytes, filename, timeout=timeout)
+    except (asyncio.TimeoutError, BrokenProcessPool) as e:
+        print(f"Error parsing {filename}: {type(e).__name__}")
+        return None
+
+
+def shutdown_parse_pool():
+    """Stop the parser processes (call on shutdown)."""
+    global _parse_pool
+    with _parse_pool_lock:
+        pool, _parse_pool = _parse_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
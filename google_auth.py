@@ -0,0 +1,130 @@
+"""
+Shared Google credentials and HTTP transports.
+
+The service account file is read once and the same credentials are used
+by the Sheets client (gspread) and the Drive client. gspread gets one
+pooled keep-alive AuthorizedSession; the Drive API client (httplib2,
+not thread-safe) gets one AuthorizedHttp per thread. A daemon thread
+refreshes the access token TOKEN_REFRESH_MARGIN seconds before it
+expires, so API calls never wait for a token fetch.
+
+requests and google-auth are imported when credentials are first needed
+(by the background warm-up), not when the bot starts.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Optional
+
+from config import GOOGLE_CREDENTIALS_FILE, GOOGLE_HTTP_POOL_SIZE, TOKEN_REFRESH_MARGIN
+
+# Google API scopes (Sheets, plus Drive for spreadsheet metadata and file uploads)
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+
+# Seconds to wait before trying again after a failed token refresh
+REFRESH_RETRY_DELAY = 30
+
+if TYPE_CHECKING:
+    import requests
+    from google.auth.transport.requests import AuthorizedSession, Request
+    from google.oauth2.service_account import Credentials
+
+_credentials: Optional["Credentials"] = None
+_session: Optional["AuthorizedSession"] = None
+_refresh_request: Optional["Request"] = None
+_refresher: Optional[threading.Thread] = None
+_lock = threading.RLock()
+_local = threading.local()
+
+
+def _mount_pool(session: "requests.Session") -> "requests.Session":
+    """Let a session keep up to GOOGLE_HTTP_POOL_SIZE connections open (one per worker thread)."""
+    from requests.adapters import HTTPAdapter
+
+    adapter = HTTPAdapter(
+        pool_connections=GOOGLE_HTTP_POOL_SIZE,
+        pool_maxsize=GOOGLE_HTTP_POOL_SIZE
+    )
+    session.mount("https://", adapter)
+    return session
+
+
+def _seconds_left(credentials: "Credentials") -> float:
+    """Seconds until the access token expires (0 if there is none)."""
+    if not credentials.token or not credentials.expiry:
+        return 0.0
+    now = datetime.now(timezone.utc).replace(tzinfo=None)  # expiry is naive UTC
+    return (credentials.expiry - now).total_seconds()
+
+
+def get_credentials() -> "Credentials":
+    """Get the service account credentials (loaded once, refreshed in the background)."""
+    global _credentials, _refresh_request
+    with _lock:
+        if _credentials is None:
+            import requests
+            from google.auth.transport.requests import Request
+            from google.oauth2.service_account import Credentials
+
+            _credentials = Credentials.from_service_account_file(
+                GOOGLE_CREDENTIALS_FILE,
+                scopes=SCOPES
+            )
+            _refresh_request = Request(session=_mount_pool(requests.Session()))
+            _start_refresher()  # Fetches the first token right away
+        return _credentials
+
+
+def refresh_credentials(margin: float = TOKEN_REFRESH_MARGIN):
+    """Fetch a new access token if the current one expires within margin seconds."""
+    with _lock:
+        if _seconds_left(_credentials) > margin:
+            return
+        _credentials.refresh(_refresh_request)
+
+
+def _start_refresher():
+    """Start the token refresh thread (once)."""
+    global _refresher
+    if _refresher is None:
+        _refresher = threading.Thread(target=_refresh_loop, name="google-token-refresh", daemon=True)
+        _refresher.start()
+
+
+def _refresh_loop():
+    """Refresh the token TOKEN_REFRESH_MARGIN seconds before it expires, forever."""
+    while True:
+        time.sleep(max(_seconds_left(_credentials) - TOKEN_REFRESH_MARGIN, 1))
+        try:
+            refresh_credentials()
+        except Exception as e:
+            print(f"Error refreshing Google access token: {e}")
+            time.sleep(REFRESH_RETRY_DELAY)
+
+
+def get_session() -> "AuthorizedSession":
+    """Get the shared keep-alive session for Sheets API calls (thread-safe)."""
+    global _session
+    with _lock:
+        if _session is None:
+            from google.auth.transport.requests import AuthorizedSession
+
+            _session = _mount_pool(AuthorizedSession(get_credentials()))
+        return _session
+
+
+def get_authorized_http():
+    """Get this thread's authorized httplib2 transport for googleapiclient (Drive)."""
+    http = getattr(_local, "http", None)
+    if http is None:
+        # Installed with google-api-python-client; only the Drive archive needs them
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
+
+        http = AuthorizedHttp(get_credentials(), http=httplib2.Http())
+        _local.http = http
+    return http
@@ -2,18 +2,31 @@
 Admin handlers for managing song requests.
 """
 
+import asyncio
+
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import RetryAfter
 from telegram.ext import ContextTypes, ConversationHandler
 
 from config import CHIEF_REGENT_ID, STORAGE_CHANNEL_ID, ADMIN_IDS
-from sheets_client import get_sheets_client
-from repertoire_list import update_repertoire_list
+from sheets_client import get_async_sheets_client, REVIEWABLE_STATUSES
+from repertoire_list import request_repertoire_update
 
 # Conversation states
 WAITING_CLARIFY_QUESTION = 3
 WAITING_CLARIFY_ANSWER = 4
 WAITING_REJECT_REASON = 5
 
+# Batch review (/review)
+REVIEW_PAGE_SIZE = 40  # Requests shown at once (Telegram allows 100 buttons per message)
+UPLOAD_CONCURRENCY = 5  # Storage channel uploads running at the same time
+UPLOAD_ATTEMPTS = 3  # Tries per upload when Telegram asks to slow down
+
+# Requests whose approval is in progress (files still being uploaded);
+# other admin actions leave them alone until the approval is recorded
+_approving: set[str] = set()
+BUSY_TEXT = "⏳ Цю заявку вже підтверджують, зачекайте."
+
 
 async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle admin button callbacks (approve, reject, clarify)."""
@@ -45,10 +58,10 @@ async def handle_admin_callback(update: Update, context: ContextTypes.DEFAULT_TY
 async def handle_approve(update: Update, context: ContextTypes.DEFAULT_TYPE, request_id: str) -> int:
     """Handle approval of a song request."""
     query = update.callback_query
-    sheets = get_sheets_client()
+    sheets = await get_async_sheets_client()
     
     # Get request info
-    request = sheets.get_request(request_id)
+    request = await sheets.get_request(request_id)
     
     if not request:
         await query.edit_message_text(
@@ -56,77 +69,140 @@ async def handle_approve(update: Update, context: ContextTypes.DEFAULT_TYPE, req
         )
         return ConversationHandler.END
     
+    if request.get("Статус") == "approved":
+        # Already approved (e.g. through /review)
+        text = f"ℹ️ Пісню «{request.get('Назва', 'Невідомо')}» вже додано до репертуару."
+        await confirm_to_admin(query, context, caption=text, fallback_text=text)
+        return ConversationHandler.END
+    
     title = request.get("Назва", "Невідомо")
     username = request.get("Username", "Невідомо")
     telegram_id = request.get("Telegram ID")
     file_id = request.get("File ID", "")
+    category = request.get("Категорія") or "Інші"
+    
+    if request_id in _approving:
+        await query.message.reply_text(BUSY_TEXT)
+        return ConversationHandler.END
     
-    # Upload file to storage channel for permanent link
-    file_link = None
-    if STORAGE_CHANNEL_ID and file_id:
+    # Repertoire rows have no ID column, so the permanent link has to be part
+    # of the inserted row: upload first, then record the approval
+    _approving.add(request_id)
+    try:
+        file_link = await upload_to_storage(context, file_id, title, username)
+        
+        # The caption and the notification only go out once the approval is
+        # stored; a failure or a second tap is reported instead of a false success
+        approved = await sheets.approve_request(request_id, title, username, file_link or "", category=category)
+    finally:
+        _approving.discard(request_id)
+    if not approved:
+        current = await sheets.get_request(request_id)
+        if current and current.get("Статус") == "approved":
+            text = f"ℹ️ Пісню «{title}» вже додано до репертуару."
+        elif current and current.get("Статус") == "rejected":
+            text = f"ℹ️ Заявку «{title}» вже відхилено."
+        else:
+            text = f"❌ Не вдалося затвердити пісню «{title}». Спробуйте ще раз."
+        await confirm_to_admin(query, context, caption=text, fallback_text=text)
+        return ConversationHandler.END
+    
+    # Update repertoire list in group (published in the background)
+    request_repertoire_update(context.bot)
+    
+    await gather_logged(
+        confirm_to_admin(
+            query,
+            context,
+            caption=f"✅ Пісню «{title}» додано до репертуару.\nРегент: {username}",
+            fallback_text=f"✅ Пісню «{title}» додано до репертуару."
+        ),
+        notify_user(
+            context,
+            telegram_id,
+            f"✅ Пісню «{title}» додано до репертуару!\n\n"
+            f"Використайте /repertoire щоб переглянути."
+        ),
+    )
+    
+    return ConversationHandler.END
+
+
+async def gather_logged(*aws):
+    """Run independent steps concurrently, printing (not raising) their errors."""
+    for result in await asyncio.gather(*aws, return_exceptions=True):
+        if isinstance(result, Exception):
+            print(f"Error in admin action: {result}")
+
+
+async def upload_to_storage(context: ContextTypes.DEFAULT_TYPE, document, title: str, username: str) -> str | None:
+    """
+    Upload a file to the storage channel and return its permanent link (None on failure).
+    
+    Args:
+        context: Bot context
+        document: Telegram file ID or an InputFile with the content
+        title: Song title
+        username: Regent name
+    """
+    if not STORAGE_CHANNEL_ID or not document:
+        return None
+    for attempt in range(UPLOAD_ATTEMPTS):
         try:
             message = await context.bot.send_document(
                 chat_id=STORAGE_CHANNEL_ID,
-                document=file_id,
+                document=document,
                 caption=f"🎵 {title}\n👤 Регент: {username}"
             )
             # Create permanent link
             channel_id = str(STORAGE_CHANNEL_ID).replace("-100", "")
-            file_link = f"https://t.me/c/{channel_id}/{message.message_id}"
+            return f"https://t.me/c/{channel_id}/{message.message_id}"
+        except RetryAfter as e:
+            # Flood control (e.g. many uploads during a batch review)
+            if attempt == UPLOAD_ATTEMPTS - 1:
+                print(f"Error uploading to channel: {e}")
+                return None
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+            await asyncio.sleep(retry_after)
         except Exception as e:
             print(f"Error uploading to channel: {e}")
-    
-    # Update status
-    sheets.update_status(request_id, "approved")
-    
-    # Add to repertoire with file link
-    sheets.add_to_repertoire(title, username, file_link or "")
-    
+            return None
+
+
+async def confirm_to_admin(query, context: ContextTypes.DEFAULT_TYPE, caption: str, fallback_text: str):
+    """Replace the caption of the admin's request message, or send a new message if that fails."""
     # Update admin message (document has caption, not text)
     try:
-        await query.edit_message_caption(
-            caption=f"✅ Пісню «{title}» додано до репертуару.\nРегент: {username}"
-        )
+        await query.edit_message_caption(caption=caption)
     except Exception as e:
         print(f"Error editing message caption: {e}")
         # Try sending a new message instead
         try:
             await context.bot.send_message(
                 chat_id=query.message.chat_id,
-                text=f"✅ Пісню «{title}» додано до репертуару."
+                text=fallback_text
             )
         except Exception as e2:
             print(f"Error sending confirmation to admin: {e2}")
-    
-    # Update repertoire list in group
-    await update_repertoire_list(context.bot)
-    
-    # Notify user
-    
-    # Notify regent
-    if telegram_id:
-        try:
-            await context.bot.send_message(
-                chat_id=int(telegram_id),
-                text=f"✅ Пісню «{title}» додано до репертуару!\n\n"
-                     f"Використайте /repertoire щоб переглянути."
-            )
-        except Exception as e:
-            print(f"Could not notify user {telegram_id}: {e}")
-    
-    # Update repertoire list in group
-    await update_repertoire_list(context.bot)
-    
-    return ConversationHandler.END
+
+
+async def notify_user(context: ContextTypes.DEFAULT_TYPE, telegram_id, text: str):
+    """Send a message to a regent, logging (not raising) delivery errors."""
+    if not telegram_id:
+        return
+    try:
+        await context.bot.send_message(chat_id=int(telegram_id), text=text)
+    except Exception as e:
+        print(f"Could not notify user {telegram_id}: {e}")
 
 
 async def handle_reject_start(update: Update, context: ContextTypes.DEFAULT_TYPE, request_id: str) -> int:
     """Start rejection process - ask admin for reason."""
     query = update.callback_query
-    sheets = get_sheets_client()
+    sheets = await get_async_sheets_client()
     
     # Get request info
-    request = sheets.get_request(request_id)
+    request = await sheets.get_request(request_id)
     
     if not request:
         await query.edit_message_text(
@@ -134,6 +210,10 @@ async def handle_reject_start(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         return ConversationHandler.END
     
+    if request_id in _approving:
+        await query.message.reply_text(BUSY_TEXT)
+        return ConversationHandler.END
+    
     # Store request_id for later
     context.user_data["reject_request_id"] = request_id
     context.user_data["reject_request"] = request
@@ -161,15 +241,12 @@ async def handle_reject_reason(update: Update, context: ContextTypes.DEFAULT_TYP
         )
         return ConversationHandler.END
     
-    sheets = get_sheets_client()
+    sheets = await get_async_sheets_client()
     
     title = request.get("Назва", "Невідомо")
     username = request.get("Username", "Невідомо")
     telegram_id = request.get("Telegram ID")
     
-    # Update status
-    sheets.update_status(request_id, "rejected")
-    
     # Prepare message for regent
     if reason == "-":
         regent_message = f"❌ Пісню «{title}» відхилено."
@@ -178,21 +255,25 @@ async def handle_reject_reason(update: Update, context: ContextTypes.DEFAULT_TYP
         regent_message = f"❌ Пісню «{title}» відхилено.\n\nПричина: {reason}"
         admin_message = f"❌ Пісню «{title}» відхилено.\nПричина: {reason}"
     
-    # Notify admin
-    await update.message.reply_text(
-        f"{admin_message}\n"
-        f"Регента {username} повідомлено."
-    )
+    # Record the rejection first; the replies only go out if it was stored
+    current = await sheets.get_request(request_id)
+    if request_id in _approving or (current and current.get("Статус") not in REVIEWABLE_STATUSES):
+        await update.message.reply_text(f"ℹ️ Заявку «{title}» вже розглянуто.")
+        context.user_data.clear()
+        return ConversationHandler.END
+    if not await sheets.update_status(request_id, "rejected"):
+        await update.message.reply_text(f"❌ Не вдалося відхилити заявку «{title}». Спробуйте ще раз.")
+        context.user_data.clear()
+        return ConversationHandler.END
     
-    # Notify regent
-    if telegram_id:
-        try:
-            await context.bot.send_message(
-                chat_id=int(telegram_id),
-                text=regent_message
-            )
-        except Exception as e:
-            print(f"Could not notify user {telegram_id}: {e}")
+    # Admin reply and regent notification are independent
+    await gather_logged(
+        update.message.reply_text(
+            f"{admin_message}\n"
+            f"Регента {username} повідомлено."
+        ),
+        notify_user(context, telegram_id, regent_message),
+    )
     
     context.user_data.clear()
     return ConversationHandler.END
@@ -201,10 +282,10 @@ async def handle_reject_reason(update: Update, context: ContextTypes.DEFAULT_TYP
 async def handle_clarify_start(update: Update, context: ContextTypes.DEFAULT_TYPE, request_id: str) -> int:
     """Start clarification process - ask admin for question."""
     query = update.callback_query
-    sheets = get_sheets_client()
+    sheets = await get_async_sheets_client()
     
     # Get request info
-    request = sheets.get_request(request_id)
+    request = await sheets.get_request(request_id)
     
     if not request:
         await query.edit_message_text(
@@ -217,7 +298,7 @@ async def handle_clarify_start(update: Update, context: ContextTypes.DEFAULT_TYP
     context.user_data["clarify_request"] = request
     
     # Update status
-    sheets.update_status(request_id, "clarifying")
+    await sheets.update_status(request_id, "clarifying")
     
     await query.edit_message_text(
         f"❓ Уточнення для заявки «{request.get('Назва', 'Невідомо')}»\n\n"
@@ -292,8 +373,8 @@ async def invite_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     if user.id not in ADMIN_IDS:
         return
 
-    sheets = get_sheets_client()
-    code = sheets.create_invite_code()
+    sheets = await get_async_sheets_client()
+    code = await sheets.create_invite_code()
     bot_username = context.bot.username
     link = f"https://t.me/{bot_username}?start={code}"
     
@@ -304,3 +385,200 @@ async def invite_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         f"Надішліть це посилання новому регенту.\n"
         f"Після переходу бот запитає Ім'я та Прізвище."
     )
+
+
+# --- Batch review ---
+
+def build_review_view(review: dict) -> tuple[str, InlineKeyboardMarkup]:
+    """Build the text and keyboard of the batch review message."""
+    selected = set(review["selected"])
+    
+    keyboard = []
+    for request_id in review["ids"]:
+        title, username = review["items"][request_id]
+        mark = "☑️" if request_id in selected else "⬜"
+        keyboard.append([InlineKeyboardButton(
+            f"{mark} {title} — {username}"[:64],
+            callback_data=f"review_toggle_{request_id}"
+        )])
+    keyboard.append([
+        InlineKeyboardButton("Вибрати всі", callback_data="review_all"),
+        InlineKeyboardButton("Зняти всі", callback_data="review_none"),
+    ])
+    keyboard.append([
+        InlineKeyboardButton(f"✅ Підтвердити ({len(selected)})", callback_data="review_approve"),
+        InlineKeyboardButton(f"❌ Відхилити ({len(selected)})", callback_data="review_reject"),
+    ])
+    keyboard.append([InlineKeyboardButton("Скасувати", callback_data="review_cancel")])
+    
+    text = f"📋 Заявки на розгляд: {review['total']}\n"
+    if review["total"] > len(review["ids"]):
+        text += f"Показано перші {len(review['ids'])}.\n"
+    text += f"Вибрано: {len(selected)}\n\nНатисніть на заявку, щоб вибрати її."
+    return text, InlineKeyboardMarkup(keyboard)
+
+
+async def review_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show pending requests so the admin can approve or reject many at once (/review)."""
+    user = update.effective_user
+    if user.id not in ADMIN_IDS:
+        return
+    
+    sheets = await get_async_sheets_client()
+    pending = await sheets.get_pending_requests()
+    
+    if not pending:
+        await update.message.reply_text("✅ Немає заявок на розгляд.")
+        return
+    
+    shown = pending[:REVIEW_PAGE_SIZE]
+    review = {
+        "ids": [r["ID"] for r in shown],
+        "items": {r["ID"]: (r.get("Назва", "Невідомо"), r.get("Username", "Невідомо")) for r in shown},
+        "selected": [],
+        "total": len(pending),
+    }
+    context.user_data["review"] = review
+    
+    text, reply_markup = build_review_view(review)
+    await update.message.reply_text(text, reply_markup=reply_markup)
+
+
+async def handle_review_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle selection and actions of the batch review message."""
+    query = update.callback_query
+    
+    if query.from_user.id not in ADMIN_IDS:
+        await query.answer("❌ Тільки головний регент може це робити.", show_alert=True)
+        return
+    
+    review = context.user_data.get("review")
+    if not review:
+        await query.answer()
+        await query.edit_message_text("❌ Список застарів. Надішліть /review ще раз.")
+        return
+    
+    data = query.data
+    
+    if data.startswith("review_toggle_"):
+        request_id = data.replace("review_toggle_", "")
+        if request_id in review["selected"]:
+            review["selected"].remove(request_id)
+        elif request_id in review["items"]:
+            review["selected"].append(request_id)
+    elif data == "review_all":
+        review["selected"] = list(review["ids"])
+    elif data == "review_none":
+        review["selected"] = []
+    elif data == "review_cancel":
+        await query.answer()
+        context.user_data.pop("review", None)
+        await query.edit_message_text("Розгляд скасовано.")
+        return
+    elif data in ("review_approve", "review_reject"):
+        if not review["selected"]:
+            await query.answer("Нічого не вибрано.", show_alert=True)
+            return
+        await query.answer()
+        context.user_data.pop("review", None)
+        if data == "review_approve":
+            await approve_selected(query, context, review["selected"])  # Uploads run in the background
+        else:
+            await reject_selected(query, context, review["selected"])
+        return
+    
+    await query.answer()
+    text, reply_markup = build_review_view(review)
+    await query.edit_message_text(text, reply_markup=reply_markup)
+
+
+async def approve_selected(query, context: ContextTypes.DEFAULT_TYPE, request_ids: list[str]):
+    """
+    Approve several requests: concurrent uploads, one batched write, one list refresh.
+    
+    The requests are claimed here and the uploads run as an application task,
+    so other chats are answered meanwhile and nobody else can review a
+    request whose file is already being posted.
+    """
+    sheets = await get_async_sheets_client()
+    requests = [await sheets.get_request(request_id) for request_id in request_ids]
+    requests = [
+        r for r in requests
+        if r and r.get("Статус") == "pending" and r["ID"] not in _approving  # Not reviewed meanwhile
+    ]
+    _approving.update(r["ID"] for r in requests)
+    
+    await query.edit_message_text(f"⏳ Підтверджую заявки: {len(requests)}...")
+    context.application.create_task(approve_batch(query, context, requests))
+
+
+async def approve_batch(query, context: ContextTypes.DEFAULT_TYPE, requests: list[dict]):
+    """Upload the claimed requests' files, record the approvals and report (background task)."""
+    sheets = await get_async_sheets_client()
+    try:
+        # Upload files to the storage channel concurrently (bounded, to respect flood limits)
+        semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+        
+        async def upload(request):
+            async with semaphore:
+                return await upload_to_storage(
+                    context,
+                    request.get("File ID", ""),
+                    request.get("Назва", "Невідомо"),
+                    request.get("Username", "Невідомо")
+                )
+        
+        links = await asyncio.gather(*(upload(r) for r in requests))
+        
+        # One transaction for all status changes and Repertoire rows
+        approved = set(await sheets.approve_requests([
+            {
+                "request_id": r["ID"],
+                "title": r.get("Назва", "Невідомо"),
+                "regent_name": r.get("Username", "Невідомо"),
+                "file_link": link or "",
+                "category": r.get("Категорія") or "Інші",
+            }
+            for r, link in zip(requests, links)
+        ]))
+    finally:
+        _approving.difference_update(r["ID"] for r in requests)
+    
+    if approved:
+        request_repertoire_update(context.bot)
+    
+    await gather_logged(*(
+        notify_user(
+            context,
+            r.get("Telegram ID"),
+            f"✅ Пісню «{r.get('Назва', 'Невідомо')}» додано до репертуару!\n\n"
+            f"Використайте /repertoire щоб переглянути."
+        )
+        for r in requests if r["ID"] in approved
+    ))
+    
+    titles = "\n".join(f"• {r.get('Назва', 'Невідомо')}" for r in requests if r["ID"] in approved)
+    await query.edit_message_text(f"✅ Підтверджено заявок: {len(approved)}\n\n{titles}")
+
+
+async def reject_selected(query, context: ContextTypes.DEFAULT_TYPE, request_ids: list[str]):
+    """Reject several requests with one batched write."""
+    sheets = await get_async_sheets_client()
+    requests = [await sheets.get_request(request_id) for request_id in request_ids]
+    requests = [
+        r for r in requests
+        if r and r.get("Статус") == "pending" and r["ID"] not in _approving  # Not reviewed meanwhile
+    ]
+    
+    rejected = set(await sheets.update_statuses([r["ID"] for r in requests], "rejected"))
+    
+    await asyncio.gather(
+        *(
+            notify_user(context, r.get("Telegram ID"), f"❌ Пісню «{r.get('Назва', 'Невідомо')}» відхилено.")
+            for r in requests if r["ID"] in rejected
+        ),
+        return_exceptions=True
+    )
+    
+    titles = "\n".join(f"• {r.get('Назва', 'Невідомо')}" for r in requests if r["ID"] in rejected)
+    await query.edit_message_text(f"❌ Відхилено заявок: {len(rejected)}\n\n{titles}")
@@ -2,16 +2,46 @@
 Common command handlers for the Telegram bot.
 """
 
+import functools
+
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import ContextTypes, ConversationHandler
 
 from config import CHIEF_REGENT_ID, ADMIN_IDS
 from repertoire_list import get_repertoire_message_link
-from sheets_client import get_sheets_client
+from sheets_client import get_async_sheets_client
+from warmup import wait_until_ready
 
 # Conversation state for name input
 WAITING_REGENT_NAME_REGISTRATION = 10
 
+ACCESS_DENIED_TEXT = (
+    "⛔️ Доступ заборонено.\n\n"
+    "Цей бот доступний тільки для авторизованих регентів.\n"
+    "Зверніться до головного регента за запрошенням."
+)
+
+
+async def is_authorized(user_id: int) -> bool:
+    """Check if user is an admin or an active regent (cached, usually no Sheets call)."""
+    await wait_until_ready()  # Right after a restart: let the store and caches warm up first
+    if user_id in ADMIN_IDS:
+        return True
+    sheets = await get_async_sheets_client()
+    return await sheets.is_regent(user_id)
+
+
+def regent_required(handler):
+    """Decorator: run the handler only for admins and active regents."""
+    @functools.wraps(handler)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if not await is_authorized(update.effective_user.id):
+            if update.effective_message:
+                await update.effective_message.reply_text(ACCESS_DENIED_TEXT)
+            return ConversationHandler.END
+        return await handler(update, context)
+    return wrapper
+
 
 async def get_main_menu_keyboard(is_admin: bool) -> ReplyKeyboardMarkup:
     """Get the main menu keyboard."""
@@ -42,7 +72,9 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
             f"• Підтверджувати заявки на пісні\n"
             f"• Відхиляти заявки\n"
             f"• Просити уточнення\n\n"
-            f"• Створити запрошення: /invite\n\n"
+            f"• Створити запрошення: /invite\n"
+            f"• Розглянути всі заявки разом: /review\n"
+            f"• Імпортувати архів пісень (ZIP): /import\n\n"
             f"Оберіть дію в меню 👇"
         )
         await update.message.reply_text(
@@ -51,10 +83,10 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         )
         return ConversationHandler.END
     
-    sheets = get_sheets_client()
+    sheets = await get_async_sheets_client()
     
     # Check if authorized regent
-    if sheets.is_regent(user.id):
+    if await sheets.is_regent(user.id):
         message = (
             f"👋 Вітаю!\n\n"
             f"Ви успішно авторизовані.\n\n"
@@ -70,7 +102,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     args = context.args
     if args and len(args) > 0:
         invite_code = args[0]
-        regent_data = sheets.get_regent_by_code(invite_code)
+        regent_data = await sheets.get_regent_by_code(invite_code)
         
         if regent_data:
             # Code valid, ask for name
@@ -86,11 +118,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
             return ConversationHandler.END
     
     # Not authorized and no code
-    await update.message.reply_text(
-        "⛔️ Доступ заборонено.\n\n"
-        "Цей бот доступний тільки для авторизованих регентів.\n"
-        "Зверніться до головного регента за запрошенням."
-    )
+    await update.message.reply_text(ACCESS_DENIED_TEXT)
     return ConversationHandler.END
 
 
@@ -104,8 +132,8 @@ async def handle_regent_name_registration(update: Update, context: ContextTypes.
         await update.message.reply_text("⚠️ Ім'я занадто коротке. Введіть Ім'я та Прізвище:")
         return WAITING_REGENT_NAME_REGISTRATION
     
-    sheets = get_sheets_client()
-    success = sheets.register_regent(invite_code, user.id, user.username, name)
+    sheets = await get_async_sheets_client()
+    success = await sheets.register_regent(invite_code, user.id, user.username, name)
     
     if success:
         context.user_data["regent_name"] = name  # Cache locally
@@ -134,6 +162,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         reply_markup=await get_main_menu_keyboard(is_admin)
     )
 
+@regent_required
 async def handle_add_song_button(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle 'Add Song' button from main menu."""
     await update.message.reply_text(
@@ -142,6 +171,7 @@ async def handle_add_song_button(update: Update, context: ContextTypes.DEFAULT_T
 
 
 
+@regent_required
 async def repertoire_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /repertoire command - show link to repertoire in group."""
     from telegram import InlineKeyboardButton, InlineKeyboardMarkup
@@ -2,14 +2,18 @@
 Document handlers for processing PDF and DOCX files from regents.
 """
 
+import asyncio
+import hashlib
+from typing import Optional
+
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ForceReply
 from telegram.ext import ContextTypes, ConversationHandler
 
 from config import CHIEF_REGENT_ID, STORAGE_CHANNEL_ID, CATEGORIES, ADMIN_IDS
-from file_parser import parse_file, normalize_title, get_file_type
-from sheets_client import get_sheets_client
-from repertoire_list import update_repertoire_list
-from handlers.common import get_main_menu_keyboard
+from file_parser import normalize_title, get_file_type
+from sheets_client import get_async_sheets_client, REVIEWABLE_STATUSES
+from repertoire_list import request_repertoire_update
+from handlers.common import get_main_menu_keyboard, regent_required
 
 # Conversation states
 WAITING_TITLE_CONFIRM = 1
@@ -21,9 +25,120 @@ WAITING_DUPLICATE_CHOICE = 8  # Choose if fuzzy match is same or different song
 WAITING_CATEGORY = 9  # Choose song category
 WAITING_REGENT_NAME_MANUAL = 11  # Admin typing regent name manually
 
+# Files above the Bot API download limit are fingerprinted by file_unique_id only
+HASH_MAX_FILE_SIZE = 20 * 1024 * 1024
+
 # Categories imported from config
 
 
+async def fetch_file_bytes(context, file_id: str) -> bytes:
+    """
+    Download a Telegram file on demand.
+    
+    Conversation state keeps only file_id and metadata; call this when a
+    parser or an upload actually needs the content.
+    
+    Args:
+        context: Bot context
+        file_id: Telegram file ID
+        
+    Returns:
+        File content as bytes
+    """
+    file = await context.bot.get_file(file_id)
+    return bytes(await file.download_as_bytearray())
+
+
+async def hash_telegram_file(context, file_id: str, file_size: Optional[int] = None) -> Optional[str]:
+    """
+    Get the SHA-256 of a Telegram file.
+    
+    The content is downloaded, hashed off the event loop and dropped.
+    
+    Args:
+        context: Bot context
+        file_id: Telegram file ID
+        file_size: Size reported by Telegram (larger files are not downloaded)
+        
+    Returns:
+        Hex digest, or None if the file could not be downloaded
+    """
+    if file_size and file_size > HASH_MAX_FILE_SIZE:
+        return None
+    try:
+        content = await fetch_file_bytes(context, file_id)
+    except Exception as e:
+        print(f"Error downloading file for hashing: {e}")
+        return None
+    return await asyncio.to_thread(lambda: hashlib.sha256(content).hexdigest())
+
+
+async def find_copy_by_content(context, document) -> tuple[Optional[dict], Optional[str]]:
+    """
+    Download a file, hash it and look for an earlier request with the same content.
+    
+    Returns:
+        Tuple of (matching request or None, SHA-256 of the file or None)
+    """
+    sha256 = await hash_telegram_file(context, document.file_id, document.file_size)
+    existing = None
+    if sha256:
+        sheets = await get_async_sheets_client()
+        existing = await sheets.find_by_fingerprint(sha256=sha256)
+    return existing, sha256
+
+
+# Content checks running while the regent types the title: Telegram user ID -> task
+# (tasks cannot be kept in user_data, which is persisted)
+_content_checks: dict[int, asyncio.Task] = {}
+
+
+def start_content_check(context, user_id: int, document):
+    """Start find_copy_by_content() in the background (replaces an older check of this user)."""
+    previous = _content_checks.pop(user_id, None)
+    if previous is not None:
+        previous.cancel()
+    _content_checks[user_id] = asyncio.create_task(find_copy_by_content(context, document))
+
+
+async def finish_content_check(context, user_id: int) -> Optional[dict]:
+    """
+    Wait for the user's content check and keep the file's SHA-256 for the request.
+    
+    Returns:
+        Earlier request with the same file, or None (also if there was no check or it failed)
+    """
+    task = _content_checks.pop(user_id, None)
+    if task is None:
+        return None
+    try:
+        existing, sha256 = await task
+    except Exception as e:
+        print(f"Error checking file fingerprint: {e}")
+        return None
+    context.user_data["sha256"] = sha256
+    return existing
+
+
+def uploaded_copy_message(request: dict) -> str:
+    """Explain that the file was already uploaded (request is a База record)."""
+    title = request.get("Назва") or request.get("Назва нормалізована")
+    regent = request.get("Username") or "Невідомо"
+    if request.get("Статус") in REVIEWABLE_STATUSES:
+        return (
+            f"⚠️ Цей файл вже надіслано на розгляд: «{title}».\n"
+            f"👤 Регент: {regent}\n\n"
+            f"Очікуйте рішення головного регента."
+        )
+    link = request.get("Посилання")
+    return (
+        f"⚠️ Цей файл вже є в репертуарі: «{title}».\n"
+        f"👤 Регент: {regent}\n"
+        + (f"🔗 {link}\n" if link else "")
+        + "\nФайл не надіслано на розгляд."
+    )
+
+
 async def upload_to_storage_channel(context, file_id: str, title: str, regent: str) -> str:
     """
     Upload file to storage channel and return permanent link.
@@ -65,6 +180,7 @@ async def upload_to_storage_channel(context, file_id: str, title: str, regent: s
         return None
 
 
+@regent_required
 async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle incoming document (PDF or DOCX)."""
     document = update.message.document
@@ -87,28 +203,37 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
         return ConversationHandler.END
     
-    # Download file
-    await update.message.reply_text("📥 Завантажую файл...")
-    
+    # Exact re-upload of a stored file? Telegram's file_unique_id needs no download
     try:
-        file = await context.bot.get_file(document.file_id)
-        file_bytes = await file.download_as_bytearray()
+        sheets = await get_async_sheets_client()
+        existing = await sheets.find_by_fingerprint(file_unique_id=document.file_unique_id)
     except Exception as e:
+        print(f"Error checking file fingerprint: {e}")
+        existing = None
+    if existing:
         await update.message.reply_text(
-            "❌ Помилка завантаження файлу.\n"
-            "Спробуйте ще раз."
+            uploaded_copy_message(existing),
+            disable_web_page_preview=True,
+            reply_markup=await get_main_menu_keyboard(user.id in ADMIN_IDS)
         )
         return ConversationHandler.END
     
-    # Store data in context (no auto-title detection)
+    # Store only a file handle in context - the content is fetched on demand
+    # with fetch_file_bytes() and never persisted (no auto-title detection)
     context.user_data["file_id"] = document.file_id
+    context.user_data["file_unique_id"] = document.file_unique_id
+    context.user_data["sha256"] = None  # Set by the content check below
     context.user_data["file_name"] = document.file_name
-    context.user_data["file_bytes"] = bytes(file_bytes)
+    context.user_data["file_size"] = document.file_size
     context.user_data["user_id"] = user.id
     # Use saved regent_name or fallback to first_name
     if not context.user_data.get("regent_name"):
         context.user_data["regent_name"] = user.first_name
     
+    # A copy under another file ID is found by content: download and hash
+    # the file while the regent types the title
+    start_content_check(context, user.id, document)
+    
     # Ask for title directly with ForceReply to open keyboard
     await update.message.reply_text(
         "📄 Файл отримано.\n\n"
@@ -190,12 +315,23 @@ async def process_title(update: Update, context: ContextTypes.DEFAULT_TYPE, titl
         user_id = update.effective_user.id
         regent_name = context.user_data.get("regent_name") or update.effective_user.username or update.effective_user.first_name
     
+    # Same file uploaded before under another file ID?
+    existing = await finish_content_check(context, update.effective_user.id)
+    if existing:
+        await message.reply_text(
+            uploaded_copy_message(existing),
+            disable_web_page_preview=True,
+            reply_markup=await get_main_menu_keyboard(update.effective_user.id in ADMIN_IDS)
+        )
+        context.user_data.clear()
+        return ConversationHandler.END
+    
     normalized = normalize_title(title)
     
     # Check for duplicate
     try:
-        sheets = get_sheets_client()
-        is_duplicate, dup_regent, matching_title, file_link, is_exact_match = sheets.check_duplicate(normalized)
+        sheets = await get_async_sheets_client()
+        is_duplicate, dup_regent, matching_title, file_link, is_exact_match = await sheets.check_duplicate(normalized)
     except Exception as e:
         if update.callback_query:
             await update.callback_query.edit_message_text(
@@ -347,8 +483,8 @@ async def proceed_after_category(update: Update, context: ContextTypes.DEFAULT_T
         keyboard.append([InlineKeyboardButton("👤 Я сам", callback_data="regent_self")])
         
         # Add Regents
-        sheets = get_sheets_client()
-        regents = sheets.get_all_regents()
+        sheets = await get_async_sheets_client()
+        regents = await sheets.get_all_regents()
         for r in regents:
             name = r.get("Name", "Невідомо")
             rid = r.get("ID") # UUID
@@ -407,7 +543,7 @@ async def handle_action_choice(update: Update, context: ContextTypes.DEFAULT_TYP
         context.user_data.clear()
         return ConversationHandler.END
     
-    sheets = get_sheets_client()
+    sheets = await get_async_sheets_client()
     
     if query.data == "action_add_direct":
         # Add directly to repertoire
@@ -415,8 +551,23 @@ async def handle_action_choice(update: Update, context: ContextTypes.DEFAULT_TYP
             # Upload to storage channel
             file_link = await upload_to_storage_channel(context, file_id, title, regent_name)
             
+            # Create request record for history (keeps the file fingerprint)
+            await sheets.create_request(
+                title=title,
+                normalized_title=normalized,
+                telegram_id=user_id,
+                username=regent_name,
+                file_id=file_id,
+                auto_title=context.user_data.get("auto_title"),
+                file_link=file_link,
+                category=category,
+                status="approved",  # Added directly, nothing to review
+                file_unique_id=context.user_data.get("file_unique_id"),
+                sha256=context.user_data.get("sha256")
+            )
+            
             # Add to repertoire
-            sheets.add_to_repertoire(title, regent_name, file_link or "", category=category)
+            await sheets.add_to_repertoire(title, regent_name, file_link or "", category=category)
             
             await query.edit_message_text(
                 f"✅ Пісню «{title}» додано до репертуару!\n"
@@ -436,7 +587,7 @@ async def handle_action_choice(update: Update, context: ContextTypes.DEFAULT_TYP
                 print(f"Error sending confirmation: {e2}")
         
         # Update repertoire list in group
-        await update_repertoire_list(context.bot)
+        request_repertoire_update(context.bot)
         
         # Restore main menu
         await context.bot.send_message(
@@ -451,7 +602,7 @@ async def handle_action_choice(update: Update, context: ContextTypes.DEFAULT_TYP
     elif query.data == "action_send_review":
         # Send for admin review
         try:
-            request_id = sheets.create_request(
+            request_id = await sheets.create_request(
                 title=title,
                 normalized_title=normalized,
                 telegram_id=user_id,
@@ -459,7 +610,9 @@ async def handle_action_choice(update: Update, context: ContextTypes.DEFAULT_TYP
                 file_id=file_id,
                 auto_title=context.user_data.get("auto_title"),
                 file_link=None,
-                category=category
+                category=category,
+                file_unique_id=context.user_data.get("file_unique_id"),
+                sha256=context.user_data.get("sha256")
             )
         except Exception as e:
             await query.edit_message_text("❌ Технічна помилка при створенні заявки.")
@@ -492,7 +645,7 @@ async def handle_action_choice(update: Update, context: ContextTypes.DEFAULT_TYP
                 caption=caption,
                 reply_markup=reply_markup
             )
-            sheets.update_message_id(request_id, admin_message.message_id)
+            await sheets.update_message_id(request_id, admin_message.message_id)
         except Exception as e:
             await query.edit_message_text("❌ Помилка при надсиланні заявки.")
             context.user_data.clear()
@@ -559,8 +712,8 @@ async def handle_clarify_answer(update: Update, context: ContextTypes.DEFAULT_TY
     if not admin_id: admin_id = CHIEF_REGENT_ID
     
     # Get request info for username
-    sheets = get_sheets_client()
-    request = sheets.get_request(request_id)
+    sheets = await get_async_sheets_client()
+    request = await sheets.get_request(request_id)
     username = request.get("Username", "Невідомо") if request else "Невідомо"
     
     # Create keyboard with approve/reject buttons
@@ -623,8 +776,6 @@ async def handle_regent_selection_callback(update: Update, context: ContextTypes
     # Get stored data
     title = context.user_data.get("final_title")
     normalized = context.user_data.get("normalized_title")
-    file_bytes = context.user_data.get("file_bytes")
-    file_name = context.user_data.get("file_name")
     category = context.user_data.get("category", "Інші")
     
     # Determine regent name
@@ -639,8 +790,8 @@ async def handle_regent_selection_callback(update: Update, context: ContextTypes
         
     elif data.startswith("regent_sel_"):
         rid = data.replace("regent_sel_", "")
-        sheets = get_sheets_client()
-        regents = sheets.get_all_regents()
+        sheets = await get_async_sheets_client()
+        regents = await sheets.get_all_regents()
         found = next((r for r in regents if r["ID"] == rid), None)
         if found:
             regent_name = found["Name"]
@@ -655,10 +806,10 @@ async def handle_regent_selection_callback(update: Update, context: ContextTypes
         )
         
         # Add directly to repertoire
-        sheets = get_sheets_client()
+        sheets = await get_async_sheets_client()
         
         # Create request record for history
-        sheets.create_request(
+        await sheets.create_request(
             title=title,
             normalized_title=normalized,
             telegram_id=update.effective_user.id, # Use actual admin ID
@@ -666,11 +817,14 @@ async def handle_regent_selection_callback(update: Update, context: ContextTypes
             file_id=context.user_data.get("file_id"),
             auto_title=context.user_data.get("auto_title"),
             file_link=file_link,
-            category=category
+            category=category,
+            status="approved",  # Added directly, nothing to review
+            file_unique_id=context.user_data.get("file_unique_id"),
+            sha256=context.user_data.get("sha256")
         )
         
         # Add to repertoire
-        sheets.add_to_repertoire(title, regent_name, file_link, category=category)
+        await sheets.add_to_repertoire(title, regent_name, file_link, category=category)
         
         await query.edit_message_text(
             f"✅ Пісню «{title}» додано до репертуару!\n"
@@ -686,7 +840,7 @@ async def handle_regent_selection_callback(update: Update, context: ContextTypes
         )
         
         # Update repertoire list in group
-        await update_repertoire_list(context.bot)
+        request_repertoire_update(context.bot)
         
     except Exception as e:
         await query.edit_message_text(f"❌ Помилка: {e}")
@@ -718,10 +872,10 @@ async def handle_regent_name_manual_input(update: Update, context: ContextTypes.
         )
         
         # Add directly to repertoire
-        sheets = get_sheets_client()
+        sheets = await get_async_sheets_client()
         
         # Create request record for history
-        sheets.create_request(
+        await sheets.create_request(
             title=title,
             normalized_title=normalized,
             telegram_id=update.effective_user.id,
@@ -729,11 +883,14 @@ async def handle_regent_name_manual_input(update: Update, context: ContextTypes.
             file_id=context.user_data.get("file_id"),
             auto_title=context.user_data.get("auto_title"),
             file_link=file_link,
-            category=category
+            category=category,
+            status="approved",  # Added directly, nothing to review
+            file_unique_id=context.user_data.get("file_unique_id"),
+            sha256=context.user_data.get("sha256")
         )
         
         # Add to repertoire
-        sheets.add_to_repertoire(title, regent_name, file_link, category=category)
+        await sheets.add_to_repertoire(title, regent_name, file_link, category=category)
         
         await update.message.reply_text(
             f"✅ Пісню «{title}» додано до репертуару!\n"
@@ -743,7 +900,7 @@ async def handle_regent_name_manual_input(update: Update, context: ContextTypes.
         )
         
         # Update repertoire list in group
-        await update_repertoire_list(context.bot)
+        request_repertoire_update(context.bot)
         
     except Exception as e:
         await update.message.reply_text(f"❌ Помилка: {e}")
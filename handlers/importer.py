@@ -0,0 +1,323 @@
+"""
+Bulk import of a repertoire archive (admin only).
+
+/import starts import mode. The admin sends ZIP archives of PDF/DOCX files
+(or the files themselves, e.g. as an album) and then /done. Titles are
+taken from the first page of each file, the whole batch is checked for
+duplicates in one pass, the files are uploaded to the storage channel
+with bounded concurrency and all new songs are added to Репертуар in
+one batch write. The import runs as an application task, so other chats
+are served while it is in progress.
+"""
+
+import asyncio
+import io
+import os
+import zipfile
+
+from telegram import Update, InputFile
+from telegram.ext import ContextTypes, ConversationHandler
+
+from config import ADMIN_IDS, CATEGORIES, STORAGE_CHANNEL_ID
+from file_parser import parse_title_async, normalize_title, get_file_type
+from sheets_client import get_async_sheets_client
+from repertoire_list import request_repertoire_update
+from title_index import TitleIndex
+from handlers.admin import upload_to_storage
+from handlers.common import get_main_menu_keyboard
+from handlers.document import fetch_file_bytes
+
+# Conversation states
+WAITING_IMPORT_FILES = 12
+
+# Limits
+IMPORT_MAX_FILES = 1000  # Songs per import
+IMPORT_MAX_FILE_SIZE = 20 * 1024 * 1024  # Uncompressed bytes per song file
+IMPORT_MAX_TOTAL_SIZE = 200 * 1024 * 1024  # Uncompressed bytes of all song files (held in memory)
+TELEGRAM_DOWNLOAD_LIMIT = 20 * 1024 * 1024  # Bots cannot download larger files
+IMPORT_UPLOAD_CONCURRENCY = 5  # Storage channel uploads running at the same time
+IMPORT_PROGRESS_EVERY = 20  # Update the progress message after this many files
+
+
+def title_from_filename(filename: str) -> str:
+    """Make a title from a file name ("01_Отче_наш.pdf" -> "Отче наш")."""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    stem = stem.replace("_", " ").strip()
+    # Drop a leading track number like "01 " or "1. "
+    head, _, rest = stem.partition(" ")
+    if rest and head.rstrip(".-").isdigit():
+        stem = rest.strip()
+    return stem
+
+
+def category_from_path(path: str) -> str:
+    """Use a folder name inside the archive as category if it matches one of CATEGORIES."""
+    by_name = {category.lower(): category for category in CATEGORIES}
+    for part in reversed(path.replace("\\", "/").split("/")[:-1]):
+        category = by_name.get(part.strip().lower())
+        if category:
+            return category
+    return "Інші"
+
+
+def _entry_name(info: zipfile.ZipInfo) -> str:
+    """Get the real file name of an archive entry (Windows archives store Cyrillic as cp866)."""
+    if info.flag_bits & 0x800:  # UTF-8 flag
+        return info.filename
+    try:
+        return info.filename.encode("cp437").decode("cp866")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+
+def read_archive(archive_bytes: bytes, max_total: int = IMPORT_MAX_TOTAL_SIZE) -> tuple[list[tuple[str, bytes]], list[str]]:
+    """
+    Extract song files from a ZIP archive.
+
+    Reading stops once the extracted files would exceed max_total bytes,
+    so a small archive cannot unpack into more than the bot can hold.
+
+    Args:
+        archive_bytes: ZIP file content
+        max_total: Uncompressed bytes that may still be extracted
+
+    Returns:
+        Tuple of ([(path, content)] for PDF/DOCX files, [skipped paths with reasons])
+    """
+    files = []
+    skipped = []
+    total = 0
+    with zipfile.ZipFile(io.BytesIO(archive_bytes)) as archive:
+        for info in archive.infolist():
+            path = _entry_name(info)
+            name = os.path.basename(path)
+            if info.is_dir() or path.startswith("__MACOSX/") or name.startswith("."):
+                continue
+            if get_file_type(name) not in ("pdf", "docx"):
+                skipped.append(f"{path} (формат)")
+                continue
+            if info.file_size > IMPORT_MAX_FILE_SIZE:
+                skipped.append(f"{path} (завеликий)")
+                continue
+            if total + info.file_size > max_total:
+                skipped.append(f"{path} і решта архіву (ліміт {IMPORT_MAX_TOTAL_SIZE // (1024 * 1024)} МБ на імпорт)")
+                break
+            # Never trust the declared size: read at most one byte more than it
+            with archive.open(info) as entry:
+                content = entry.read(info.file_size + 1)
+            if len(content) > info.file_size:
+                skipped.append(f"{path} (пошкоджений архів)")
+                continue
+            total += len(content)
+            files.append((path, content))
+    return files, skipped
+
+
+async def extract_song_title(content: bytes, path: str) -> str:
+    """Get the title from the start of the file, falling back to the file name."""
+    return await parse_title_async(content, os.path.basename(path)) or title_from_filename(path)
+
+
+async def import_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Start import mode (/import [regent name])."""
+    user = update.effective_user
+    if user.id not in ADMIN_IDS:
+        return ConversationHandler.END
+
+    regent_name = " ".join(context.args or []).strip() or context.user_data.get("regent_name") or user.first_name
+    context.user_data["import_files"] = []
+    context.user_data["import_regent"] = regent_name
+
+    await update.message.reply_text(
+        f"📦 Імпорт репертуару\n\n"
+        f"Надішліть ZIP-архів(и) з PDF/DOCX файлами або самі файли.\n"
+        f"Папки з назвами категорій стануть категоріями пісень.\n"
+        f"Telegram не дає ботам завантажувати файли понад 20 МБ — більший архів "
+        f"розділіть на кілька або надішліть файли альбомом.\n"
+        f"👤 Регент: {regent_name}\n\n"
+        f"Коли все надіслано — /done. Скасувати — /cancel."
+    )
+    return WAITING_IMPORT_FILES
+
+
+async def handle_import_file(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Collect an archive or song file for the import (only the file handle is kept)."""
+    document = update.message.document
+    name = document.file_name or ""
+
+    if not name.lower().endswith(".zip") and get_file_type(name) not in ("pdf", "docx"):
+        await update.message.reply_text("⚠️ Підтримуються ZIP, PDF та DOCX файли.")
+        return WAITING_IMPORT_FILES
+
+    if document.file_size and document.file_size > TELEGRAM_DOWNLOAD_LIMIT:
+        await update.message.reply_text(
+            f"⚠️ «{name}» більший за 20 МБ — Telegram не дає ботам завантажувати такі файли.\n"
+            f"Розділіть архів на кілька менших або надішліть пісні альбомом."
+        )
+        return WAITING_IMPORT_FILES
+
+    files = context.user_data.setdefault("import_files", [])
+    files.append({"file_id": document.file_id, "file_name": name})
+
+    # Albums arrive as many messages - answer only for archives to avoid a reply per file
+    if name.lower().endswith(".zip"):
+        await update.message.reply_text(f"📦 Архів «{name}» додано. Надішліть ще або /done.")
+    return WAITING_IMPORT_FILES
+
+
+async def handle_import_done(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Run the import of everything collected (/done)."""
+    files = context.user_data.get("import_files") or []
+    regent_name = context.user_data.get("import_regent") or update.effective_user.first_name
+
+    if not files:
+        await update.message.reply_text("⚠️ Немає файлів для імпорту. Надішліть архів або /cancel.")
+        return WAITING_IMPORT_FILES
+
+    context.user_data.pop("import_files", None)
+    context.user_data.pop("import_regent", None)
+
+    progress = await update.message.reply_text(f"⏳ Завантажую файли: {len(files)}...")
+    context.application.create_task(run_import(context, update.message, progress, files, regent_name))
+    return ConversationHandler.END
+
+
+async def run_import(context: ContextTypes.DEFAULT_TYPE, message, progress, files: list[dict], regent_name: str):
+    """
+    Import the collected files, reporting in the progress message (background task).
+
+    Args:
+        context: Bot context
+        message: The admin's /done message (the menu is sent as a reply to it)
+        progress: Bot message that shows progress and the final report
+        files: Collected {"file_id", "file_name"} items
+        regent_name: Regent the songs are added under
+    """
+    try:
+        report = await import_files(context, progress, files, regent_name)
+    except Exception as e:
+        print(f"Error importing files: {e}")
+        report = "❌ Не вдалося завершити імпорт. Спробуйте ще раз."
+    await progress.edit_text(report[:4000])
+
+    await message.reply_text(
+        "Оберіть наступну дію 👇",
+        reply_markup=await get_main_menu_keyboard(True)
+    )
+
+
+async def import_files(context: ContextTypes.DEFAULT_TYPE, progress, files: list[dict], regent_name: str) -> str:
+    """Download, parse, check, upload and add the songs. Returns the report text."""
+    # 1. Download and unpack
+    songs = []  # (path, content)
+    skipped = []
+    total_size = 0  # Uncompressed bytes held in memory (at most IMPORT_MAX_TOTAL_SIZE)
+    for item in files:
+        if total_size >= IMPORT_MAX_TOTAL_SIZE:
+            skipped.append(f"{item['file_name']} (ліміт {IMPORT_MAX_TOTAL_SIZE // (1024 * 1024)} МБ на імпорт)")
+            continue
+        try:
+            content = await fetch_file_bytes(context, item["file_id"])
+        except Exception as e:
+            skipped.append(f"{item['file_name']} (не вдалося завантажити: {e})")
+            continue
+        if item["file_name"].lower().endswith(".zip"):
+            try:
+                entries, archive_skipped = read_archive(content, IMPORT_MAX_TOTAL_SIZE - total_size)
+            except zipfile.BadZipFile:
+                skipped.append(f"{item['file_name']} (пошкоджений архів)")
+                continue
+            songs.extend(entries)
+            skipped.extend(archive_skipped)
+            total_size += sum(len(entry) for _, entry in entries)
+        elif total_size + len(content) > IMPORT_MAX_TOTAL_SIZE:
+            skipped.append(f"{item['file_name']} (ліміт {IMPORT_MAX_TOTAL_SIZE // (1024 * 1024)} МБ на імпорт)")
+        else:
+            songs.append((item["file_name"], content))
+            total_size += len(content)
+
+    if len(songs) > IMPORT_MAX_FILES:
+        skipped.extend(f"{path} (ліміт {IMPORT_MAX_FILES})" for path, _ in songs[IMPORT_MAX_FILES:])
+        songs = songs[:IMPORT_MAX_FILES]
+
+    # 2. Titles (parsed in worker processes, off the event loop)
+    await progress.edit_text(f"⏳ Визначаю назви: {len(songs)} файлів...")
+    titles = await asyncio.gather(*(
+        extract_song_title(content, path) for path, content in songs
+    ))
+
+    # 3. Duplicate detection for the whole batch in one pass, then within the batch
+    sheets = await get_async_sheets_client()
+    existing = await sheets.check_duplicates([normalize_title(title) for title in titles])
+
+    batch_index = TitleIndex()
+    to_import = []  # (path, content, title, category)
+    duplicates = []
+    similar = []
+    for (path, content), title, match in zip(songs, titles, existing):
+        normalized = normalize_title(title)
+        if not normalized:
+            skipped.append(f"{path} (немає назви)")
+            continue
+        if match and match.score == 1.0:
+            duplicates.append(title)
+            continue
+        in_batch = batch_index.best(normalized)
+        if in_batch and in_batch.score == 1.0:
+            duplicates.append(title)
+            continue
+        if match or in_batch:
+            similar.append(f"{title} ≈ {(match or in_batch).payload[1]}")
+        batch_index.add(normalized, (regent_name, title, None))
+        to_import.append((path, content, title, category_from_path(path)))
+
+    # 4. Storage uploads with bounded concurrency
+    semaphore = asyncio.Semaphore(IMPORT_UPLOAD_CONCURRENCY)
+    done = 0
+
+    async def upload(path, content, title):
+        nonlocal done
+        async with semaphore:
+            link = await upload_to_storage(
+                context,
+                InputFile(io.BytesIO(content), filename=os.path.basename(path)),
+                title,
+                regent_name
+            )
+        done += 1
+        if done % IMPORT_PROGRESS_EVERY == 0:
+            try:
+                await progress.edit_text(f"⏳ Завантажено в сховище: {done}/{len(to_import)}...")
+            except Exception:
+                pass
+        return link
+
+    links = await asyncio.gather(*(
+        upload(path, content, title) for path, content, title, _ in to_import
+    ))
+
+    # 5. One batch write and one list refresh (songs whose upload failed stay out:
+    # a Репертуар row cannot get its link later)
+    failed = [title for (_, _, title, _), link in zip(to_import, links) if STORAGE_CHANNEL_ID and not link]
+    added = await sheets.add_songs([
+        {"title": title, "regent_name": regent_name, "file_link": link or "", "category": category}
+        for (_, _, title, category), link in zip(to_import, links)
+        if link or not STORAGE_CHANNEL_ID
+    ])
+    if added:
+        request_repertoire_update(context.bot)
+
+    # Report
+    report = [f"✅ Імпортовано пісень: {added}"]
+    if duplicates:
+        report.append(f"⏭ Вже є в репертуарі: {len(duplicates)}")
+    if similar:
+        report.append("\n⚠️ Додано, але схожі на наявні (перевірте):")
+        report.extend(f"• {line}" for line in similar[:30])
+    if failed:
+        report.append(f"\n❌ Не вдалося завантажити в канал (не додано): {len(failed)}")
+        report.extend(f"• {title}" for title in failed[:30])
+    if skipped:
+        report.append(f"\n🚫 Пропущено: {len(skipped)}")
+        report.extend(f"• {line}" for line in skipped[:30])
+    return "\n".join(report)
@@ -0,0 +1,480 @@
+"""
+Local SQLite store - the bot's system of record for songs, requests and regents.
+
+Handlers read and write here. Google Sheets is a human-editable mirror:
+every local change is queued in the outbox table and copied to the
+Репертуар/База/Регенти sheets in batches by SheetsClient.replicate_pending().
+Approved songs waiting to be archived to Google Drive are queued in the
+drive_uploads table (see drive_client.DriveArchiver).
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+from file_parser import normalize_title
+
+# Sheet headers (column order of the rows stored below)
+REPERTOIRE_HEADERS = ["Назва", "Додано", "Регент", "Посилання", "Категорія"]
+DATABASE_HEADERS = [
+    "ID", "Назва", "Назва нормалізована", "Telegram ID",
+    "Username", "Статус", "Дата", "File ID", "Message ID",
+    "Назва авто", "Назва ручна", "Посилання", "Категорія",
+    "File Unique ID", "SHA-256", "Drive"
+]
+REGENTS_HEADERS = ["ID", "Name", "Invite Code", "Telegram ID", "Username", "Status", "Created At"]
+
+# Table columns, in the same order as the headers above
+SONG_COLUMNS = ("title", "added", "regent", "link", "category")
+REQUEST_COLUMNS = (
+    "id", "title", "normalized_title", "telegram_id",
+    "username", "status", "created", "file_id", "message_id",
+    "auto_title", "manual_title", "link", "category",
+    "file_unique_id", "sha256", "drive_link"
+)
+REGENT_COLUMNS = ("id", "name", "invite_code", "telegram_id", "username", "status", "created_at")
+
+# Table names (also used in the outbox)
+SONGS = "songs"
+REQUESTS = "requests"
+REGENTS = "regents"
+
+# Request statuses the chief regent can still approve or reject
+REVIEWABLE_STATUSES = ("pending", "clarifying")
+
+TABLE_COLUMNS = {
+    SONGS: SONG_COLUMNS,
+    REQUESTS: REQUEST_COLUMNS,
+    REGENTS: REGENT_COLUMNS,
+}
+
+
+def _columns_sql(columns: tuple) -> str:
+    return ",\n    ".join(f"{col} TEXT NOT NULL DEFAULT ''" for col in columns)
+
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS songs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    {_columns_sql(SONG_COLUMNS)},
+    normalized_title TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_songs_normalized_title ON songs (normalized_title);
+
+CREATE TABLE IF NOT EXISTS requests (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    {_columns_sql(REQUEST_COLUMNS)}
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_requests_id ON requests (id);
+CREATE INDEX IF NOT EXISTS idx_requests_normalized_title ON requests (normalized_title);
+CREATE INDEX IF NOT EXISTS idx_requests_status ON requests (status);
+
+CREATE TABLE IF NOT EXISTS regents (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    {_columns_sql(REGENT_COLUMNS)}
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_regents_id ON regents (id);
+CREATE INDEX IF NOT EXISTS idx_regents_telegram_id ON regents (telegram_id);
+CREATE INDEX IF NOT EXISTS idx_regents_invite_code ON regents (invite_code);
+
+-- Local changes not yet copied to Google Sheets
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    tbl TEXT NOT NULL,
+    key TEXT NOT NULL,
+    op TEXT NOT NULL  -- 'insert' or 'update'
+);
+
+-- Songs waiting to be archived to Google Drive (survives restarts)
+CREATE TABLE IF NOT EXISTS drive_uploads (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    request_id TEXT NOT NULL,
+    file_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',  -- 'queued', 'uploaded' (not shared yet) or 'failed'
+    drive_file_id TEXT NOT NULL DEFAULT '',
+    link TEXT NOT NULL DEFAULT '',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_drive_uploads_state ON drive_uploads (state);
+"""
+
+# Indexes on columns added to existing databases by _add_missing_columns()
+LATE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_requests_file_unique_id ON requests (file_unique_id);
+CREATE INDEX IF NOT EXISTS idx_requests_sha256 ON requests (sha256);
+"""
+
+
+def _pad(values: list, width: int) -> list[str]:
+    """Convert values to strings and pad/trim them to width."""
+    values = ["" if v is None else str(v) for v in values[:width]]
+    return values + [""] * (width - len(values))
+
+
+class LocalStore:
+    """SQLite database with songs, requests, regents and the Sheets outbox."""
+
+    def __init__(self, filepath: str):
+        """Open (or create) the database."""
+        self.filepath = filepath
+        self._lock = threading.RLock()
+        self._depth = 0  # Nesting level of transaction()
+        self._conn = sqlite3.connect(filepath, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._add_missing_columns()
+        self._conn.executescript(LATE_INDEXES)
+
+    def _add_missing_columns(self):
+        """Add columns introduced after a database was created (e.g. file fingerprints)."""
+        for table, columns in TABLE_COLUMNS.items():
+            existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            for column in columns:
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+
+    @contextmanager
+    def transaction(self):
+        """Group several writes into one atomic transaction (may be nested)."""
+        with self._lock:
+            if self._depth == 0:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("COMMIT")
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _enqueue(self, table: str, key, op: str):
+        """Queue a change for the Sheets mirror (call inside transaction())."""
+        self._conn.execute(
+            "INSERT INTO outbox (tbl, key, op) VALUES (?, ?, ?)",
+            (table, str(key), op)
+        )
+
+    def is_empty(self) -> bool:
+        """Check whether nothing was stored yet."""
+        return not any(
+            self._query(f"SELECT 1 FROM {table} LIMIT 1")
+            for table in (SONGS, REQUESTS, REGENTS)
+        )
+
+    # --- Songs (Репертуар) ---
+
+    def insert_song(self, values: list) -> int:
+        """Add a song (values in REPERTOIRE_HEADERS order) and queue it for Sheets."""
+        values = _pad(values, len(SONG_COLUMNS))
+        with self.transaction():
+            cursor = self._conn.execute(
+                f"INSERT INTO songs ({', '.join(SONG_COLUMNS)}, normalized_title) "
+                f"VALUES ({', '.join('?' * len(SONG_COLUMNS))}, ?)",
+                (*values, normalize_title(values[0]))
+            )
+            song_seq = cursor.lastrowid
+            self._enqueue(SONGS, song_seq, "insert")
+        return song_seq
+
+    def songs(self) -> list[list[str]]:
+        """Get all songs in sheet order."""
+        return [list(row) for row in self._query(
+            f"SELECT {', '.join(SONG_COLUMNS)} FROM songs ORDER BY seq"
+        )]
+
+    # --- Requests (База) ---
+
+    def insert_request(self, values: list):
+        """Add a request (values in DATABASE_HEADERS order) and queue it for Sheets."""
+        values = _pad(values, len(REQUEST_COLUMNS))
+        with self.transaction():
+            self._conn.execute(
+                f"INSERT INTO requests ({', '.join(REQUEST_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(REQUEST_COLUMNS))})",
+                values
+            )
+            self._enqueue(REQUESTS, values[0], "insert")
+
+    def update_request(self, request_id: str, fields: dict[str, str]) -> bool:
+        """Update columns of a request and queue the change. Returns False if not found."""
+        return self._update(REQUESTS, request_id, fields)
+
+    def get_request(self, request_id: str) -> Optional[list[str]]:
+        """Get a request row by ID."""
+        rows = self._query(
+            f"SELECT {', '.join(REQUEST_COLUMNS)} FROM requests WHERE id = ?",
+            (request_id,)
+        )
+        return list(rows[0]) if rows else None
+
+    def requests_by_status(self, status: str) -> list[list[str]]:
+        """Get request rows with the given status, oldest first."""
+        return [list(row) for row in self._query(
+            f"SELECT {', '.join(REQUEST_COLUMNS)} FROM requests WHERE status = ? ORDER BY seq",
+            (status,)
+        )]
+
+    def request_by_fingerprint(
+        self,
+        file_unique_id: str = "",
+        sha256: str = "",
+        statuses: tuple[str, ...] = ("approved", *REVIEWABLE_STATUSES)
+    ) -> Optional[list[str]]:
+        """
+        Get the oldest request for the same file (indexed lookup).
+
+        Args:
+            file_unique_id: Telegram file_unique_id
+            sha256: Hex SHA-256 of the file content
+            statuses: Only match requests with these statuses
+
+        Returns:
+            Request row or None
+        """
+        conditions = []
+        params = []
+        for column, value in (("file_unique_id", file_unique_id), ("sha256", sha256)):
+            if value:  # Rows without a fingerprint store '' and must never match
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if not conditions or not statuses:
+            return None
+        rows = self._query(
+            f"SELECT {', '.join(REQUEST_COLUMNS)} FROM requests "
+            # "+status" keeps SQLite on the fingerprint indexes (most rows share a status)
+            f"WHERE ({' OR '.join(conditions)}) AND +status IN ({', '.join('?' * len(statuses))}) "
+            f"ORDER BY seq LIMIT 1",
+            (*params, *statuses)
+        )
+        return list(rows[0]) if rows else None
+
+    # --- Regents (Регенти) ---
+
+    def insert_regent(self, values: list):
+        """Add a regent/invite (values in REGENTS_HEADERS order) and queue it for Sheets."""
+        values = _pad(values, len(REGENT_COLUMNS))
+        with self.transaction():
+            self._conn.execute(
+                f"INSERT INTO regents ({', '.join(REGENT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(REGENT_COLUMNS))})",
+                values
+            )
+            self._enqueue(REGENTS, values[0], "insert")
+
+    def update_regent(self, regent_id: str, fields: dict[str, str]) -> bool:
+        """Update columns of a regent and queue the change. Returns False if not found."""
+        return self._update(REGENTS, regent_id, fields)
+
+    def regent_by(self, column: str, value: str) -> Optional[list[str]]:
+        """Get the first regent row where column equals value (indexed lookup)."""
+        if column not in REGENT_COLUMNS:
+            raise ValueError(f"Unknown regent column: {column}")
+        rows = self._query(
+            f"SELECT {', '.join(REGENT_COLUMNS)} FROM regents WHERE {column} = ? ORDER BY seq LIMIT 1",
+            (str(value),)
+        )
+        return list(rows[0]) if rows else None
+
+    def regents(self) -> list[list[str]]:
+        """Get all regent rows in sheet order."""
+        return [list(row) for row in self._query(
+            f"SELECT {', '.join(REGENT_COLUMNS)} FROM regents ORDER BY seq"
+        )]
+
+    # --- Shared helpers ---
+
+    def _update(self, table: str, key: str, fields: dict[str, str]) -> bool:
+        columns = TABLE_COLUMNS[table]
+        for column in fields:
+            if column not in columns:
+                raise ValueError(f"Unknown {table} column: {column}")
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self.transaction():
+            cursor = self._conn.execute(
+                f"UPDATE {table} SET {assignments} WHERE id = ?",
+                (*[str(v) for v in fields.values()], key)
+            )
+            if cursor.rowcount == 0:
+                return False
+            self._enqueue(table, key, "update")
+        return True
+
+    def row_values(self, table: str, key: str) -> Optional[list[str]]:
+        """Get a row in sheet column order (songs are keyed by seq, others by id)."""
+        columns = TABLE_COLUMNS[table]
+        key_column = "seq" if table == SONGS else "id"
+        rows = self._query(
+            f"SELECT {', '.join(columns)} FROM {table} WHERE {key_column} = ?",
+            (key,)
+        )
+        return list(rows[0]) if rows else None
+
+    # --- Outbox ---
+
+    def pending_ops(self, limit: int = 500) -> list[tuple[int, str, str, str]]:
+        """Get queued changes as (seq, table, key, op), oldest first."""
+        return self._query(
+            "SELECT seq, tbl, key, op FROM outbox ORDER BY seq LIMIT ?",
+            (limit,)
+        )
+
+    def outbox_size(self) -> int:
+        """Number of changes not yet copied to Sheets."""
+        return self._query("SELECT COUNT(*) FROM outbox")[0][0]
+
+    def ack(self, seqs: list[int]):
+        """Remove changes that were copied to Sheets."""
+        if not seqs:
+            return
+        with self.transaction():
+            self._conn.executemany("DELETE FROM outbox WHERE seq = ?", [(seq,) for seq in seqs])
+
+    # --- Drive archive queue ---
+
+    def queue_drive_upload(self, request_id: str, file_id: str, title: str):
+        """Queue a song file for archiving to Google Drive (may be called inside transaction())."""
+        with self.transaction():
+            self._conn.execute(
+                "INSERT INTO drive_uploads (request_id, file_id, title) VALUES (?, ?, ?)",
+                (request_id, file_id, title)
+            )
+
+    def drive_uploads(self, state: str, limit: int = 100) -> list[tuple]:
+        """Get queued uploads as (seq, request_id, file_id, title, drive_file_id, link, attempts), oldest first."""
+        return self._query(
+            "SELECT seq, request_id, file_id, title, drive_file_id, link, attempts "
+            "FROM drive_uploads WHERE state = ? ORDER BY seq LIMIT ?",
+            (state, limit)
+        )
+
+    def mark_drive_uploaded(self, seq: int, drive_file_id: str, link: str):
+        """Record that a file was uploaded (it still has to be shared)."""
+        with self.transaction():
+            self._conn.execute(
+                "UPDATE drive_uploads SET state = 'uploaded', drive_file_id = ?, link = ? WHERE seq = ?",
+                (drive_file_id, link, seq)
+            )
+
+    def mark_drive_failed(self, seq: int, error: str, max_attempts: int):
+        """Count a failed attempt; the upload is given up after max_attempts."""
+        with self.transaction():
+            self._conn.execute(
+                "UPDATE drive_uploads SET attempts = attempts + 1, error = ?, "
+                "state = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE state END "
+                "WHERE seq = ?",
+                (error, max_attempts, seq)
+            )
+
+    def finish_drive_uploads(self, done: list[tuple[int, str, str]]):
+        """
+        Remove archived uploads and store their Drive links on the requests.
+
+        Args:
+            done: (seq, request_id, link) per upload
+        """
+        if not done:
+            return
+        with self.transaction():
+            for seq, request_id, link in done:
+                self._conn.execute("DELETE FROM drive_uploads WHERE seq = ?", (seq,))
+                self._update(REQUESTS, request_id, {"drive_link": link})
+
+    # --- Import from Sheets ---
+
+    def apply_sheet_rows(self, songs: list[list], requests: list[list], regents: list[list]) -> Optional[set[str]]:
+        """
+        Bring local tables in line with rows read from the sheets (header rows excluded).
+
+        Only rows that differ are written: songs are compared by position,
+        requests and regents by ID. Nothing is applied while the outbox holds
+        local changes the sheets have not seen yet.
+
+        Returns:
+            Names of the tables that changed, or None if skipped
+        """
+        with self.transaction():
+            if self._conn.execute("SELECT 1 FROM outbox LIMIT 1").fetchone():
+                return None
+
+            changed = set()
+            if self._apply_songs(songs):
+                changed.add(SONGS)
+            for table, rows in ((REQUESTS, requests), (REGENTS, regents)):
+                if self._apply_keyed_rows(table, rows):
+                    changed.add(table)
+            return changed
+
+    def _apply_songs(self, rows: list[list]) -> bool:
+        """Update songs that differ from the sheet rows at the same position."""
+        width = len(SONG_COLUMNS)
+        new_rows = [values for values in (_pad(row, width) for row in rows) if any(values)]
+        old_rows = self._conn.execute(
+            f"SELECT seq, {', '.join(SONG_COLUMNS)} FROM songs ORDER BY seq"
+        ).fetchall()
+
+        changed = False
+        assignments = ", ".join(f"{col} = ?" for col in SONG_COLUMNS)
+        for (seq, *old_values), new_values in zip(old_rows, new_rows):
+            if old_values != new_values:
+                self._conn.execute(
+                    f"UPDATE songs SET {assignments}, normalized_title = ? WHERE seq = ?",
+                    (*new_values, normalize_title(new_values[0]), seq)
+                )
+                changed = True
+        for seq, *_ in old_rows[len(new_rows):]:
+            self._conn.execute("DELETE FROM songs WHERE seq = ?", (seq,))
+            changed = True
+        for new_values in new_rows[len(old_rows):]:
+            self._conn.execute(
+                f"INSERT INTO songs ({', '.join(SONG_COLUMNS)}, normalized_title) "
+                f"VALUES ({', '.join('?' * width)}, ?)",
+                (*new_values, normalize_title(new_values[0]))
+            )
+            changed = True
+        return changed
+
+    def _apply_keyed_rows(self, table: str, rows: list[list]) -> bool:
+        """Insert, update or delete request/regent rows so they match the sheet rows by ID."""
+        columns = TABLE_COLUMNS[table]
+        old_rows = {
+            row[0]: list(row)
+            for row in self._conn.execute(f"SELECT {', '.join(columns)} FROM {table}")
+        }
+        new_rows = {}
+        for values in (_pad(row, len(columns)) for row in rows):
+            if values[0]:  # Rows need an ID; the first copy of a duplicated ID wins
+                new_rows.setdefault(values[0], values)
+
+        changed = False
+        assignments = ", ".join(f"{col} = ?" for col in columns[1:])
+        for key, values in new_rows.items():
+            old_values = old_rows.get(key)
+            if old_values is None:
+                self._conn.execute(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    values
+                )
+                changed = True
+            elif old_values != values:
+                self._conn.execute(
+                    f"UPDATE {table} SET {assignments} WHERE id = ?",
+                    (*values[1:], key)
+                )
+                changed = True
+        for key in old_rows.keys() - new_rows.keys():
+            self._conn.execute(f"DELETE FROM {table} WHERE id = ?", (key,))
+            changed = True
+        return changed
@@ -1,22 +1,30 @@
 """
 Repertoire list management - auto-updating pinned messages in group.
-Uses 3 pinned messages to support large lists.
+Uses as many messages as the list needs; the first one is pinned.
 """
 
 import os
 import json
+import asyncio
+import hashlib
 import logging
 from telegram import Bot
-from sheets_client import get_sheets_client
-from config import REPERTOIRE_GROUP_ID, CATEGORIES
+from sheets_client import get_async_sheets_client
+from config import REPERTOIRE_GROUP_ID, REPERTOIRE_UPDATE_DELAY, CATEGORIES
 
 logger = logging.getLogger(__name__)
 
 # Path to store message IDs (JSON list)
 MESSAGE_IDS_FILE = os.path.join(os.path.dirname(__file__), ".repertoire_message_ids")
 
-# Number of messages to use
-MESSAGE_COUNT = 3
+# Path to store hashes of the last published text of each message (JSON list)
+MESSAGE_HASHES_FILE = os.path.join(os.path.dirname(__file__), ".repertoire_message_hashes")
+
+# Footer line with the refresh time; ignored when comparing chunk contents
+UPDATED_LINE_PREFIX = "_Оновлено: "
+
+# Minimum number of messages to keep (more are added as the list grows)
+MIN_MESSAGE_COUNT = 1
 MAX_CHARS_PER_MESSAGE = 3800  # Safe limit (max is 4096)
 
 CATEGORY_EMOJIS = {
@@ -52,6 +60,35 @@ def save_message_ids(message_ids: list[int]):
         logger.error(f"Error saving message IDs: {e}")
 
 
+def get_stored_message_hashes() -> list[str]:
+    """Get stored chunk hashes from file."""
+    try:
+        if os.path.exists(MESSAGE_HASHES_FILE):
+            with open(MESSAGE_HASHES_FILE, "r") as f:
+                return json.load(f)
+    except Exception as e:
+        logger.error(f"Error reading message hashes: {e}")
+    return []
+
+
+def save_message_hashes(hashes: list[str]):
+    """Save chunk hashes to file."""
+    try:
+        with open(MESSAGE_HASHES_FILE, "w") as f:
+            json.dump(hashes, f)
+    except Exception as e:
+        logger.error(f"Error saving message hashes: {e}")
+
+
+def chunk_hash(text: str) -> str:
+    """Hash a chunk's text, ignoring the "Оновлено" timestamp line."""
+    content = "\n".join(
+        line for line in text.split("\n")
+        if not line.startswith(UPDATED_LINE_PREFIX)
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
 def format_full_repertoire_text(repertoire: list[dict]) -> str:
     """Format full repertoire text grouped by category."""
     if not repertoire:
@@ -94,13 +131,13 @@ def format_full_repertoire_text(repertoire: list[dict]) -> str:
         lines.append("_Немає пісень_")
     
     lines.append(f"\n_Всього: {count - 1} пісень_")
-    lines.append(f"_Оновлено: {__import__('datetime').datetime.now().strftime('%d.%m.%Y %H:%M')}_")
+    lines.append(f"{UPDATED_LINE_PREFIX}{__import__('datetime').datetime.now().strftime('%d.%m.%Y %H:%M')}_")
     
     return "\n".join(lines)
 
 
-def split_text_into_chunks(text: str, chunk_count: int) -> list[str]:
-    """Split text into chunks by lines, respecting max limit."""
+def split_text_into_chunks(text: str, min_count: int = MIN_MESSAGE_COUNT) -> list[str]:
+    """Split text into chunks by lines, respecting max limit (never drops lines)."""
     lines = text.split('\n')
     chunks = []
     current_chunk = []
@@ -125,24 +162,39 @@ def split_text_into_chunks(text: str, chunk_count: int) -> list[str]:
         chunks.append("\n".join(current_chunk))
         
     # Pad with empty strings if fewer chunks than requested
-    while len(chunks) < chunk_count:
+    while len(chunks) < min_count:
         chunks.append("")
         
-    return chunks[:chunk_count]  # Limit to requested count
+    return chunks
+
+
+async def allocate_repertoire_message(bot: Bot, index: int, total: int) -> int:
+    """Send a placeholder message for part index (0-based) and return its ID."""
+    msg = await bot.send_message(
+        chat_id=REPERTOIRE_GROUP_ID,
+        text=f"📋 *Репертуар хору (частина {index+1}/{total})*\n_Завантаження..._",
+        parse_mode="Markdown",
+        disable_notification=True
+    )
+    return msg.message_id
+
+
+async def retire_repertoire_messages(bot: Bot, message_ids: list[int]):
+    """Delete messages that are no longer needed for the list."""
+    for mid in message_ids:
+        try:
+            await bot.delete_message(chat_id=REPERTOIRE_GROUP_ID, message_id=mid)
+        except Exception:
+            pass  # Ignore if already deleted
 
 
-async def reset_repertoire_messages(bot: Bot) -> bool:
+async def reset_repertoire_messages(bot: Bot, count: int = MIN_MESSAGE_COUNT) -> bool:
     """Delete old messages and create new ones."""
     if not REPERTOIRE_GROUP_ID:
         return False
         
     # Delete old messages if known
-    old_ids = get_stored_message_ids()
-    for mid in old_ids:
-        try:
-            await bot.delete_message(chat_id=REPERTOIRE_GROUP_ID, message_id=mid)
-        except Exception:
-            pass  # Ignore if already deleted
+    await retire_repertoire_messages(bot, get_stored_message_ids())
             
     # Also check if there was a separate file for single ID and delete it
     old_single_file = os.path.join(os.path.dirname(__file__), ".repertoire_message_id")
@@ -158,27 +210,23 @@ async def reset_repertoire_messages(bot: Bot) -> bool:
     # Create new messages
     new_ids = []
     try:
-        for i in range(MESSAGE_COUNT):
-            msg = await bot.send_message(
-                chat_id=REPERTOIRE_GROUP_ID,
-                text=f"📋 *Репертуар хору (частина {i+1}/{MESSAGE_COUNT})*\n_Завантаження..._",
-                parse_mode="Markdown",
-                disable_notification=True
-            )
-            new_ids.append(msg.message_id)
+        for i in range(count):
+            message_id = await allocate_repertoire_message(bot, i, count)
+            new_ids.append(message_id)
             
             # Pin only the first message
             if i == 0:
                 try:
                     await bot.pin_chat_message(
                         chat_id=REPERTOIRE_GROUP_ID,
-                        message_id=msg.message_id,
+                        message_id=message_id,
                         disable_notification=True
                     )
                 except Exception as e:
-                    logger.error(f"Error pinning message {msg.message_id}: {e}")
+                    logger.error(f"Error pinning message {message_id}: {e}")
                 
         save_message_ids(new_ids)
+        save_message_hashes([])  # New messages hold placeholder text
         return True
     except Exception as e:
         logger.error(f"Error creating repertoire messages: {e}")
@@ -191,24 +239,43 @@ async def update_repertoire_list(bot: Bot) -> bool:
         return False
     
     try:
-        sheets = get_sheets_client()
-        repertoire = sheets.get_repertoire()
+        sheets = await get_async_sheets_client()
+        repertoire = await sheets.get_repertoire()
         full_text = format_full_repertoire_text(repertoire)
         
-        chunks = split_text_into_chunks(full_text, MESSAGE_COUNT)
+        chunks = split_text_into_chunks(full_text)
         
         message_ids = get_stored_message_ids()
         
-        # If no IDs or count mismatch, reset
-        if not message_ids or len(message_ids) != MESSAGE_COUNT:
-            logger.info("Resetting repertoire messages due to ID mismatch")
-            if not await reset_repertoire_messages(bot):
+        # If no IDs, create the messages from scratch
+        if not message_ids:
+            logger.info("Creating repertoire messages")
+            if not await reset_repertoire_messages(bot, len(chunks)):
                 return False
             message_ids = get_stored_message_ids()
+        
+        # Hashes of what each message currently shows
+        hashes = get_stored_message_hashes()
+        hashes = hashes[:len(message_ids)] + [""] * (len(message_ids) - len(hashes))
+        
+        # Grow: add messages for new parts, keeping existing ones
+        while len(message_ids) < len(chunks):
+            message_ids.append(await allocate_repertoire_message(bot, len(message_ids), len(chunks)))
+            hashes.append("")
+            save_message_ids(message_ids)
+        
+        # Shrink: retire messages the list no longer needs
+        if len(message_ids) > len(chunks):
+            surplus = message_ids[len(chunks):]
+            message_ids = message_ids[:len(chunks)]
+            hashes = hashes[:len(chunks)]
+            save_message_ids(message_ids)
+            save_message_hashes(hashes)
+            await retire_repertoire_messages(bot, surplus)
             
         # Update messages
         for i, text in enumerate(chunks):
-            chunk_header = f"📋 *Репертуар хору ({i+1}/{MESSAGE_COUNT})*\n"
+            chunk_header = f"📋 *Репертуар хору ({i+1}/{len(chunks)})*\n"
             current_text = text
             
             # Ensure header is present if it's not the first part (or for consistency)
@@ -236,6 +303,11 @@ async def update_repertoire_list(bot: Bot) -> bool:
                 # But he also said "to be on top".
                 # Simply update text.
                 final_text = current_text
+            
+            # Skip messages whose content did not change
+            new_hash = chunk_hash(final_text)
+            if hashes[i] == new_hash:
+                continue
                 
             try:
                 await bot.edit_message_text(
@@ -245,19 +317,24 @@ async def update_repertoire_list(bot: Bot) -> bool:
                     parse_mode="Markdown",
                     disable_web_page_preview=True
                 )
+                hashes[i] = new_hash
             except Exception as e:
+                if "message is not modified" in str(e).lower():
+                    hashes[i] = new_hash
+                    continue
                 logger.error(f"Could not edit message {message_ids[i]}: {e}")
                 # If deleted, we might need full reset.
                 if "Message to edit not found" in str(e) or "message to edit not found" in str(e):
                      # Try one reset
                      logger.info("Message missing, resetting all.")
-                     await reset_repertoire_messages(bot)
+                     await reset_repertoire_messages(bot, len(chunks))
                      # Recursive call? careful. Just return False to retry next time or try once.
                      # Better to fail now and next update will handle it? 
                      # Or retry immediately once.
                      # Let's not recurse infinite.
                      return False
-                     
+        
+        save_message_hashes(hashes)
         return True
         
     except Exception as e:
@@ -265,6 +342,67 @@ async def update_repertoire_list(bot: Bot) -> bool:
         return False
 
 
+class RepertoirePublisher:
+    """
+    Background publisher for the repertoire list.
+    
+    Handlers call mark_dirty() instead of awaiting a full rebuild. Requests
+    arriving within the coalescing window are merged into one refresh, and
+    only one refresh runs at a time.
+    """
+    
+    def __init__(self, bot: Bot, delay: float = REPERTOIRE_UPDATE_DELAY):
+        """Initialize the publisher for a bot."""
+        self._bot = bot
+        self._delay = delay
+        self._dirty = asyncio.Event()
+        self._task: asyncio.Task | None = None
+    
+    def mark_dirty(self):
+        """Schedule a refresh (returns immediately)."""
+        self._dirty.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def _run(self):
+        """Refresh the list until no new updates were requested."""
+        while self._dirty.is_set():
+            # Let more changes accumulate before rebuilding
+            await asyncio.sleep(self._delay)
+            self._dirty.clear()
+            try:
+                await update_repertoire_list(self._bot)
+            except Exception as e:
+                logger.error(f"Error publishing repertoire list: {e}")
+    
+    async def flush(self):
+        """Wait for pending refreshes to finish (e.g. before shutdown)."""
+        if self._task and not self._task.done():
+            await self._task
+
+
+_publisher: RepertoirePublisher | None = None
+
+
+def get_repertoire_publisher(bot: Bot) -> RepertoirePublisher:
+    """Get or create the repertoire publisher singleton."""
+    global _publisher
+    if _publisher is None:
+        _publisher = RepertoirePublisher(bot)
+    return _publisher
+
+
+def request_repertoire_update(bot: Bot):
+    """Mark the repertoire list dirty; it is republished in the background."""
+    get_repertoire_publisher(bot).mark_dirty()
+
+
+async def flush_repertoire_updates():
+    """Publish any pending repertoire list update now."""
+    if _publisher is not None:
+        await _publisher.flush()
+
+
 def get_repertoire_message_link() -> str | None:
     """Get link to the pinned repertoire message (first one)."""
     message_ids = get_stored_message_ids()
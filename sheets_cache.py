@@ -0,0 +1,117 @@
+"""
+Row lookup for the Google Sheets mirror.
+
+Songs, requests and regents are read from the local store (local_store.py).
+The mirror keeps what the worksheets contain here so that it can find the
+sheet row of a request or regent ID without a Sheets API call when it
+writes an update, and so that a pull can compare the sheets with the store.
+"""
+
+import re
+from typing import Optional
+
+
+def row_from_updated_range(updated_range: str) -> Optional[int]:
+    """
+    Get the first row number from an A1 range returned by the Sheets API.
+
+    Args:
+        updated_range: Range like "'База'!A15:M15"
+
+    Returns:
+        Row number (15) or None if it cannot be parsed
+    """
+    if not updated_range:
+        return None
+    cells = updated_range.rsplit("!", 1)[-1]
+    match = re.match(r"[A-Za-z]+(\d+)", cells)
+    return int(match.group(1)) if match else None
+
+
+class WorksheetCache:
+    """Rows of one worksheet, addressed by sheet row number (header is row 1)."""
+
+    def __init__(self, width: int):
+        """
+        Initialize an empty cache.
+
+        Args:
+            width: Number of columns the bot uses in this sheet
+        """
+        self.width = width
+        self._rows: list[list[str]] = []
+        self._indexes: dict[int, dict[str, int]] = {}  # column -> value -> row number
+
+    def _pad(self, row: list) -> list[str]:
+        """Pad a row with empty strings up to the cache width."""
+        row = ["" if value is None else str(value) for value in row]
+        if len(row) < self.width:
+            row.extend([""] * (self.width - len(row)))
+        return row
+
+    def load(self, values: list[list]):
+        """Replace cache contents with values of the whole sheet (header first)."""
+        self._rows = [self._pad(row) for row in values[1:]]
+        self._indexes = {}
+
+    def rows(self):
+        """Iterate over (row_number, row) pairs."""
+        for index, row in enumerate(self._rows):
+            yield index + 2, row
+
+    def put_row(self, row_number: int, row: list):
+        """Store a row at the given sheet row number, growing the cache if needed."""
+        index = row_number - 2
+        while len(self._rows) <= index:
+            self._rows.append(self._pad([]))
+        old_row = self._rows[index]
+        self._rows[index] = self._pad(row)
+        for col in self._indexes:
+            self._reindex(col, row_number, old_row[col - 1], self._rows[index][col - 1])
+
+    def append(self, row: list, row_number: Optional[int] = None) -> int:
+        """
+        Add a row that was appended to the sheet.
+
+        Args:
+            row: Row values
+            row_number: Row the API reported, or None to place it after the last cached row
+
+        Returns:
+            Sheet row number of the added row
+        """
+        if row_number is None:
+            row_number = len(self._rows) + 2
+        self.put_row(row_number, row)
+        return row_number
+
+    def _reindex(self, col: int, row_number: int, old_value: str, new_value: str):
+        """Move a row from old_value to new_value in the index of one column."""
+        index = self._indexes[col]
+        if old_value and index.get(old_value) == row_number:
+            del index[old_value]
+        if new_value:
+            index.setdefault(new_value, row_number)
+
+    def find(self, col: int, value: str) -> Optional[int]:
+        """
+        Find the first row whose cell in the given column equals value.
+
+        The per-column index is built on first use and kept up to date by
+        put_row, so repeated lookups are dictionary hits.
+
+        Args:
+            col: 1-based column number
+            value: Exact cell value
+
+        Returns:
+            Sheet row number or None if not cached
+        """
+        index = self._indexes.get(col)
+        if index is None:
+            index = {}
+            for row_number, row in self.rows():
+                if row[col - 1]:
+                    index.setdefault(row[col - 1], row_number)
+            self._indexes[col] = index
+        return index.get(str(value))
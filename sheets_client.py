@@ -1,145 +1,436 @@
 """
 Google Sheets client for managing repertoire data and regents.
+
+Songs, requests and regents live in the local SQLite store (local_store.py),
+which answers every handler call. Google Sheets is kept as a mirror: local
+changes are queued in the store's outbox and copied to the sheets in batches
+by a background task, and manual edits in the sheets are pulled back when
+nothing is waiting to be sent.
+
+gspread is imported by connect(), which runs in the background after
+startup, so it is not loaded before the bot starts polling.
 """
 
 import uuid
+import asyncio
 import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
+from functools import partial
+from typing import Callable, Optional
 
-import gspread
-from google.oauth2.service_account import Credentials
+from config import (
+    GOOGLE_SHEET_ID,
+    GOOGLE_DRIVE_FOLDER_ID,
+    SHEET_REPERTOIRE,
+    SHEET_DATABASE,
+    SHEET_REGENTS,
+    SHEETS_MAX_WORKERS,
+    SHEETS_CALL_TIMEOUT,
+    SHEETS_CONNECT_TIMEOUT,
+    SHEETS_POLL_INTERVAL,
+    AUTH_CACHE_TTL,
+    LOCAL_STORE_FILE,
+    SHEETS_MIRROR_DELAY,
+    SHEETS_READS_PER_MINUTE,
+    SHEETS_WRITES_PER_MINUTE,
+    SHEETS_MAX_RETRIES,
+)
+from file_parser import normalize_title
+from google_auth import get_credentials, get_session
+from local_store import (
+    LocalStore,
+    REPERTOIRE_HEADERS,
+    DATABASE_HEADERS,
+    REGENTS_HEADERS,
+    REQUEST_COLUMNS,
+    SONGS,
+    REQUESTS,
+    REGENTS,
+    REVIEWABLE_STATUSES,
+)
+from sheets_cache import WorksheetCache, row_from_updated_range
+from sheets_scheduler import SheetsScheduler, INTERACTIVE, BACKGROUND
+from title_index import TitleIndex, TitleMatch
 
-from config import GOOGLE_SHEET_ID, GOOGLE_CREDENTIALS_FILE, SHEET_REPERTOIRE, SHEET_DATABASE, SHEET_REGENTS
 
+class SheetsClient:
+    """Client for the local store and its Google Sheets mirror."""
 
-# Google Sheets API scopes
-SCOPES = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive"
-]
-
+    def __init__(self, store_path: str = LOCAL_STORE_FILE):
+        """Open the local store (Google Sheets is connected separately)."""
+        self._store = LocalStore(store_path)
 
-class SheetsClient:
-    """Client for interacting with Google Sheets."""
-    
-    def __init__(self):
-        """Initialize the Google Sheets client."""
         self._client = None
         self._spreadsheet = None
         self._repertoire_sheet = None
         self._database_sheet = None
         self._regents_sheet = None
-    
+
+        # What the sheets currently contain (see sheets_cache.py); used to
+        # locate rows when mirroring local changes
+        self._cache_lock = threading.RLock()
+        self._repertoire_cache = WorksheetCache(width=len(REPERTOIRE_HEADERS))
+        self._database_cache = WorksheetCache(width=len(DATABASE_HEADERS))
+        self._regents_cache = WorksheetCache(width=len(REGENTS_HEADERS))
+        self._title_index = None  # Built lazily from the local store
+        self._sheets_revision = None  # Spreadsheet lastUpdateTime at the last pull
+        self._verify_pull = False  # Revision adopted after own writes; download on the next pull
+
+        # Only one thread mirrors to the sheets at a time; every API call
+        # goes through the scheduler (quotas, priorities, retries)
+        self._sync_lock = threading.Lock()
+        self._scheduler = SheetsScheduler(
+            reads_per_minute=SHEETS_READS_PER_MINUTE,
+            writes_per_minute=SHEETS_WRITES_PER_MINUTE,
+            max_retries=SHEETS_MAX_RETRIES,
+        )
+
+        # Authorization cache: Telegram ID -> (active regent record or None, expires at)
+        self._auth_cache: dict[int, tuple[Optional[dict], float]] = {}
+
+    @property
+    def is_connected(self) -> bool:
+        """Whether Google Sheets has been connected."""
+        return self._spreadsheet is not None
+
+    @property
+    def scheduler(self) -> SheetsScheduler:
+        """Scheduler all Sheets API calls go through."""
+        return self._scheduler
+
+    @property
+    def store(self) -> LocalStore:
+        """Local store (also holds the Drive archive queue)."""
+        return self._store
+
+    def needs_bootstrap(self) -> bool:
+        """Whether the local store is empty and must be loaded from Sheets before use."""
+        return self._store.is_empty()
+
     def connect(self):
-        """Establish connection to Google Sheets."""
-        credentials = Credentials.from_service_account_file(
-            GOOGLE_CREDENTIALS_FILE,
-            scopes=SCOPES
+        """Establish connection to Google Sheets and pull its data into the local store."""
+        import gspread
+
+        # Shared credentials and keep-alive session (see google_auth.py)
+        client = gspread.Client(
+            get_credentials(),
+            http_client=partial(gspread.HTTPClient, session=get_session())
         )
-        self._client = gspread.authorize(credentials)
-        self._spreadsheet = self._client.open_by_key(GOOGLE_SHEET_ID)
-        
-        # Get or create worksheets
-        self._repertoire_sheet = self._get_or_create_sheet(SHEET_REPERTOIRE)
-        self._database_sheet = self._get_or_create_sheet(SHEET_DATABASE)
-        self._regents_sheet = self._get_or_create_sheet(SHEET_REGENTS)
-        
+        spreadsheet = self._scheduler.read(client.open_by_key, GOOGLE_SHEET_ID)
+        self._client = client
+
+        # Get or create worksheets (one metadata read for all of them)
+        worksheets = {sheet.title: sheet for sheet in self._scheduler.read(spreadsheet.worksheets)}
+        self._repertoire_sheet = self._get_or_create_sheet(spreadsheet, worksheets, SHEET_REPERTOIRE)
+        self._database_sheet = self._get_or_create_sheet(spreadsheet, worksheets, SHEET_DATABASE)
+        self._regents_sheet = self._get_or_create_sheet(spreadsheet, worksheets, SHEET_REGENTS)
+
         # Ensure headers exist
-        self._ensure_headers()
-    
-    def _get_or_create_sheet(self, sheet_name: str):
-        """Get existing sheet or create new one."""
-        try:
-            return self._spreadsheet.worksheet(sheet_name)
-        except gspread.exceptions.WorksheetNotFound:
-            return self._spreadsheet.add_worksheet(title=sheet_name, rows=1000, cols=20)
-    
-    def _ensure_headers(self):
-        """Ensure headers are set in all sheets."""
-        # Repertoire headers
-        repertoire_headers = ["Назва", "Додано", "Регент", "Посилання", "Категорія"]
-        existing = self._repertoire_sheet.row_values(1)
-        if not existing or existing[:5] != repertoire_headers:
-            self._repertoire_sheet.update("A1:E1", [repertoire_headers])
-        
-        # Database headers
-        database_headers = [
-            "ID", "Назва", "Назва нормалізована", "Telegram ID",
-            "Username", "Статус", "Дата", "File ID", "Message ID",
-            "Назва авто", "Назва ручна", "Посилання", "Категорія"
-        ]
-        existing = self._database_sheet.row_values(1)
-        if not existing or existing[:13] != database_headers:
-            self._database_sheet.update("A1:M1", [database_headers])
-
-        # Regents headers
-        regents_headers = ["ID", "Name", "Invite Code", "Telegram ID", "Username", "Status", "Created At"]
-        existing = self._regents_sheet.row_values(1)
-        if not existing or existing[:7] != regents_headers:
-            self._regents_sheet.update("A1:G1", [regents_headers])
-    
-    def check_duplicate(self, normalized_title: str) -> tuple[bool, Optional[str], Optional[str], Optional[str], bool]:
-        """Check if a song with this title already exists in Repertoire or Database."""
-        from difflib import SequenceMatcher
-        
-        # Threshold for similarity (0.8 = 80% similar)
-        SIMILARITY_THRESHOLD = 0.75
-        normalized_lower = normalized_title.lower().strip()
-        
-        try:
-            # First check in Repertoire (active songs)
-            rep_titles = self._repertoire_sheet.col_values(1)[1:]  # Назва
-            rep_regents = self._repertoire_sheet.col_values(3)[1:]  # Регент
-            rep_links = self._repertoire_sheet.col_values(4)[1:]  # Посилання
-            
-            for i, title in enumerate(rep_titles):
-                if not title:
-                    continue
-                title_lower = title.lower().strip()
-                regent = rep_regents[i] if i < len(rep_regents) else "Невідомо"
-                link = rep_links[i] if i < len(rep_links) else None
-                
-                # Exact match
-                if title_lower == normalized_lower:
-                    return True, regent, title, link, True
-                
-                # Fuzzy match
-                similarity = SequenceMatcher(None, normalized_lower, title_lower).ratio()
-                if similarity >= SIMILARITY_THRESHOLD:
-                    return True, regent, title, link, False
-            
-            # Then check in Database (approved songs)
-            existing_titles = self._database_sheet.col_values(3)[1:]  # Normalized title
-            existing_original_titles = self._database_sheet.col_values(2)[1:]  # Original title
-            existing_usernames = self._database_sheet.col_values(5)[1:]  # Username column
-            existing_statuses = self._database_sheet.col_values(6)[1:]  # Status column
-            existing_links = self._database_sheet.col_values(12)[1:]  # Link column
-            
-            for i, title in enumerate(existing_titles):
-                # Only check approved songs
-                if i >= len(existing_statuses) or existing_statuses[i] != "approved":
+        self._ensure_headers(spreadsheet)
+
+        self._spreadsheet = spreadsheet
+        self.pull_from_sheets(force=True)
+
+    def _get_or_create_sheet(self, spreadsheet, worksheets: dict, sheet_name: str):
+        """Get existing sheet (from the worksheets listed by title) or create new one."""
+        sheet = worksheets.get(sheet_name)
+        if sheet is None:
+            sheet = self._scheduler.write(spreadsheet.add_worksheet, title=sheet_name, rows=1000, cols=20)
+        return sheet
+
+    def _ensure_headers(self, spreadsheet):
+        """Ensure headers are set in all sheets (one batch read, at most one batch write)."""
+        from gspread.utils import rowcol_to_a1
+
+        sheets = (
+            (self._repertoire_sheet, REPERTOIRE_HEADERS),
+            (self._database_sheet, DATABASE_HEADERS),
+            (self._regents_sheet, REGENTS_HEADERS),
+        )
+        response = self._scheduler.read(
+            spreadsheet.values_batch_get,
+            [f"'{sheet.title}'!1:1" for sheet, _ in sheets]
+        )
+        value_ranges = response.get("valueRanges", [])
+
+        data = []
+        for (sheet, headers), value_range in zip(sheets, value_ranges):
+            existing = (value_range.get("values") or [[]])[0]
+            if existing[:len(headers)] != headers:
+                data.append({
+                    "range": f"'{sheet.title}'!A1:{rowcol_to_a1(1, len(headers))}",
+                    "values": [headers],
+                })
+        if data:
+            self._scheduler.write(
+                spreadsheet.values_batch_update,
+                {"valueInputOption": "RAW", "data": data}
+            )
+
+    def refresh_cache(self):
+        """Reload all three worksheets into memory with a single batch read."""
+        ranges = [f"'{sheet.title}'" for sheet in (
+            self._repertoire_sheet, self._database_sheet, self._regents_sheet
+        )]
+        response = self._scheduler.read(self._spreadsheet.values_batch_get, ranges)
+        value_ranges = response.get("valueRanges", [])
+
+        with self._cache_lock:
+            for cache, value_range in zip(
+                (self._repertoire_cache, self._database_cache, self._regents_cache),
+                value_ranges
+            ):
+                cache.load(value_range.get("values", []))
+
+    def pull_from_sheets(self, force: bool = False) -> set[str]:
+        """
+        Apply manual edits made in the sheets to the local store.
+
+        The spreadsheet's last update time is checked first (one cheap Drive
+        metadata call); the sheets are only downloaded when it has changed,
+        and only rows that differ from the local store are written.
+
+        Skipped while local changes are still waiting to be mirrored, so
+        they are never overwritten by an older copy of the sheets.
+
+        Args:
+            force: Download the sheets even if the revision did not change
+
+        Returns:
+            Names of the local tables that changed (see local_store.py)
+        """
+        if self._store.outbox_size():
+            return set()
+
+        revision = self._scheduler.read(self._spreadsheet.get_lastUpdateTime)
+        if not force and not self._verify_pull and revision == self._sheets_revision:
+            return set()
+
+        self.refresh_cache()
+        with self._cache_lock:
+            changed = self._store.apply_sheet_rows(
+                [row for _, row in self._repertoire_cache.rows()],
+                [row for _, row in self._database_cache.rows()],
+                [row for _, row in self._regents_cache.rows()],
+            )
+            if changed is None:
+                # Local writes arrived meanwhile; try again after they are mirrored
+                return set()
+            self._sheets_revision = revision
+            self._verify_pull = False
+            if changed & {SONGS, REQUESTS}:
+                self._title_index = None
+            if REGENTS in changed:
+                self.invalidate_regent()  # Regents may have been added or disabled by hand
+        return changed
+
+    # --- Mirroring local changes to Sheets ---
+
+    def _mirror(self, table: str) -> tuple:
+        """Get the worksheet and its cache for a local table."""
+        return {
+            SONGS: (self._repertoire_sheet, self._repertoire_cache),
+            REQUESTS: (self._database_sheet, self._database_cache),
+            REGENTS: (self._regents_sheet, self._regents_cache),
+        }[table]
+
+    def _find_mirror_row(self, table: str, key: str) -> Optional[int]:
+        """Get the sheet row number of a request/regent ID (column A)."""
+        sheet, cache = self._mirror(table)
+        with self._cache_lock:
+            row_number = cache.find(1, key)
+        if row_number:
+            return row_number
+
+        # Not cached (e.g. rows were moved by hand after the last refresh)
+        cell = self._scheduler.read(sheet.find, key, in_column=1)
+        return cell.row if cell else None
+
+    def replicate_pending(self, limit: int = 500) -> int:
+        """
+        Copy queued local changes to the sheets.
+
+        New rows are sent with one append per sheet; changed rows are written
+        whole with a single values.batchUpdate. An insert followed by updates
+        of the same row is sent as one append with the current values.
+
+        Args:
+            limit: Maximum number of outbox entries to process
+
+        Returns:
+            Number of outbox entries processed
+        """
+        from gspread.utils import rowcol_to_a1
+
+        ops = self._store.pending_ops(limit)
+        if not ops:
+            return 0
+
+        inserts: dict[str, dict[str, list[int]]] = {SONGS: {}, REQUESTS: {}, REGENTS: {}}
+        updates: dict[str, dict[str, list[int]]] = {SONGS: {}, REQUESTS: {}, REGENTS: {}}
+        for seq, table, key, op in ops:
+            if op == "insert" or key in inserts[table]:
+                inserts[table].setdefault(key, []).append(seq)
+            else:
+                updates[table].setdefault(key, []).append(seq)
+
+        # Appends are acknowledged per sheet, so a later failure never re-sends them
+        for table, keyed_seqs in inserts.items():
+            if not keyed_seqs:
+                continue
+            sheet, cache = self._mirror(table)
+            rows = [self._store.row_values(table, key) for key in keyed_seqs]
+            rows = [row for row in rows if row is not None]
+            if rows:
+                response = self._scheduler.write(sheet.append_rows, rows)
+                start = row_from_updated_range(
+                    (response or {}).get("updates", {}).get("updatedRange", "")
+                )
+                with self._cache_lock:
+                    for offset, row in enumerate(rows):
+                        cache.append(row, start + offset if start else None)
+            self._store.ack([seq for seqs in keyed_seqs.values() for seq in seqs])
+
+        data = []
+        written = []
+        skipped = []
+        for table, keyed_seqs in updates.items():
+            sheet, _ = self._mirror(table)
+            for key, seqs in keyed_seqs.items():
+                row = self._store.row_values(table, key)
+                row_number = self._find_mirror_row(table, key) if row and table != SONGS else None
+                if not row_number:
+                    # Row is gone from one side; nothing to update
+                    print(f"Skipping Sheets update for {table} {key}: row not found")
+                    skipped.extend(seqs)
                     continue
-                
-                title_lower = title.lower().strip()
-                regent = existing_usernames[i] if i < len(existing_usernames) else "Невідомо"
-                original = existing_original_titles[i] if i < len(existing_original_titles) else title
-                link = existing_links[i] if i < len(existing_links) else None
-                
-                # Exact match
-                if title_lower == normalized_lower:
-                    return True, regent, original, link, True
-                
-                # Fuzzy match
-                similarity = SequenceMatcher(None, normalized_lower, title_lower).ratio()
-                if similarity >= SIMILARITY_THRESHOLD:
-                    return True, regent, original, link, False
-            
-            return False, None, None, None, False
-        except Exception as e:
-            print(f"Error checking duplicate: {e}")
+                data.append({
+                    "range": f"'{sheet.title}'!{rowcol_to_a1(row_number, 1)}:{rowcol_to_a1(row_number, len(row))}",
+                    "values": [row],
+                })
+                written.append((table, row_number, row, seqs))
+
+        if data:
+            self._scheduler.write(
+                self._spreadsheet.values_batch_update,
+                {"valueInputOption": "RAW", "data": data}
+            )
+            with self._cache_lock:
+                for table, row_number, row, _ in written:
+                    self._mirror(table)[1].put_row(row_number, row)
+        self._store.ack(skipped + [seq for *_, seqs in written for seq in seqs])
+        return len(ops)
+
+    def sync_with_sheets(self, pull: bool = True, priority: int = BACKGROUND) -> set[str]:
+        """
+        Bring the sheets up to date with the local store (connecting first if needed).
+
+        Args:
+            pull: Also apply manual edits made in the sheets
+            priority: Scheduler priority of the API calls (INTERACTIVE or BACKGROUND)
+
+        Returns:
+            Names of the local tables changed by the pull
+        """
+        with self._sync_lock, self._scheduler.priority(priority):
+            if not self.is_connected:
+                self.connect()
+            if not self._store.outbox_size():
+                return self.pull_from_sheets() if pull else set()
+
+            # Our own writes change the revision too; if nobody else edited the
+            # sheets since the last pull, adopt the new revision instead of
+            # downloading everything again to find nothing. A manual edit made
+            # while we were writing is hidden by that, so the next pull after
+            # an adopted revision always downloads.
+            revision = self._scheduler.read(self._spreadsheet.get_lastUpdateTime)
+            unchanged = self._sheets_revision is not None and revision == self._sheets_revision
+            while self.replicate_pending():
+                pass
+            if unchanged and not self._verify_pull and not self._store.outbox_size():
+                self._sheets_revision = self._scheduler.read(self._spreadsheet.get_lastUpdateTime)
+                self._verify_pull = True
+                return set()
+            return self.pull_from_sheets() if pull else set()
+
+    # --- Songs and requests ---
+
+    def _get_title_index(self) -> TitleIndex:
+        """Get the duplicate-detection index, rebuilding it from the local store if needed."""
+        with self._cache_lock:
+            if self._title_index is None:
+                index = TitleIndex()
+
+                # Repertoire (active songs) first, so it wins ties
+                # Columns: 1=Назва, 3=Регент, 4=Посилання
+                for row in self._store.songs():
+                    if row[0]:
+                        index.add(normalize_title(row[0]), (row[2] or "Невідомо", row[0], row[3] or None))
+
+                # Then approved songs from Database
+                # Columns: 2=Original title, 3=Normalized title, 5=Username, 12=Link
+                for row in self._store.requests_by_status("approved"):
+                    index.add(normalize_title(row[2]), (row[4] or "Невідомо", row[1] or row[2], row[11] or None))
+
+                self._title_index = index
+            return self._title_index
+
+    def warm_caches(self):
+        """Build the title index and the authorization cache before the first user needs them."""
+        self._get_title_index()
+
+        expires = time.monotonic() + AUTH_CACHE_TTL
+        regents = [dict(zip(REGENTS_HEADERS, row)) for row in self._store.regents()]
+        with self._cache_lock:
+            for regent in regents:
+                telegram_id = regent.get("Telegram ID")
+                if regent.get("Status") == "active" and telegram_id and telegram_id.isdigit():
+                    self._auth_cache[int(telegram_id)] = (regent, expires)
+
+    def find_similar_titles(self, normalized_title: str, limit: int = 5) -> list[TitleMatch]:
+        """
+        Find the best matching songs in Repertoire and approved Database rows.
+
+        Args:
+            normalized_title: Title as returned by normalize_title()
+            limit: Maximum number of matches
+
+        Returns:
+            Matches (best first); payload is (regent, original_title, link)
+        """
+        return self._get_title_index().search(normalize_title(normalized_title), limit=limit)
+
+    def check_duplicate(self, normalized_title: str) -> tuple[bool, Optional[str], Optional[str], Optional[str], bool]:
+        """
+        Check if a song with this title already exists in Repertoire or Database.
+
+        Errors are raised rather than reported as "not a duplicate".
+        """
+        matches = self.find_similar_titles(normalized_title, limit=1)
+        if not matches:
             return False, None, None, None, False
-    
+
+        best = matches[0]
+        regent, original, link = best.payload
+        return True, regent, original, link, best.score == 1.0
+
+    def check_duplicates(self, normalized_titles: list[str]) -> list[Optional[TitleMatch]]:
+        """
+        Find the best existing match for many titles in one pass over the index.
+
+        Args:
+            normalized_titles: Titles as returned by normalize_title()
+
+        Returns:
+            Best match (payload is (regent, original_title, link)) or None, per title
+        """
+        index = self._get_title_index()
+        with self._cache_lock:
+            return [index.best(normalize_title(title)) for title in normalized_titles]
+
     def create_request(
         self,
         title: str,
@@ -149,114 +440,252 @@ class SheetsClient:
         file_id: str,
         auto_title: Optional[str] = None,
         file_link: Optional[str] = None,
-        category: str = "Інші"
+        category: str = "Інші",
+        status: str = "pending",
+        file_unique_id: Optional[str] = None,
+        sha256: Optional[str] = None
     ) -> str:
-        """Create a new song request."""
+        """
+        Create a new song request (status "approved" records a song added directly).
+
+        file_unique_id and sha256 fingerprint the file, so a re-upload of
+        it is recognized by find_by_fingerprint().
+        """
         request_id = str(uuid.uuid4())[:8]
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
+
         row = [
             request_id,
             title,
             normalized_title,
             str(telegram_id),
             username,
-            "pending",
+            status,
             timestamp,
             file_id,
             "",  # Message ID
             auto_title or "",
             title if auto_title != title else "",
             file_link or "",
-            category
+            category,
+            file_unique_id or "",
+            sha256 or "",
+            ""  # Drive link
         ]
-        
-        self._database_sheet.append_row(row)
+
+        with self._store.transaction():
+            self._store.insert_request(row)
+            if status == "approved" and GOOGLE_DRIVE_FOLDER_ID and file_id:
+                self._store.queue_drive_upload(request_id, file_id, title)
         return request_id
-    
+
+    def find_by_fingerprint(self, file_unique_id: Optional[str] = None, sha256: Optional[str] = None) -> Optional[dict]:
+        """
+        Find an approved or still reviewable request for exactly the same file.
+
+        Args:
+            file_unique_id: Telegram file_unique_id (same for every copy of a file)
+            sha256: Hex SHA-256 of the file content
+
+        Returns:
+            Request dict (keys from DATABASE_HEADERS) or None
+        """
+        row = self._store.request_by_fingerprint(file_unique_id or "", sha256 or "")
+        return dict(zip(DATABASE_HEADERS, row)) if row else None
+
+    def update_request(self, request_id: str, fields: dict[int, str]) -> bool:
+        """
+        Update several cells of a request row in one transaction.
+
+        Args:
+            request_id: Request ID
+            fields: Column number (1-based) -> new value
+
+        Returns:
+            True if the request was found and updated
+        """
+        updated = self._store.update_request(
+            request_id,
+            {REQUEST_COLUMNS[col - 1]: value for col, value in fields.items()}
+        )
+        if updated and 6 in fields:
+            with self._cache_lock:
+                self._title_index = None
+        return updated
+
     def update_message_id(self, request_id: str, message_id: int):
         """Update the admin message ID for a request."""
-        cell = self._database_sheet.find(request_id, in_column=1)
-        if cell:
-            self._database_sheet.update_cell(cell.row, 9, str(message_id))
-    
+        self.update_request(request_id, {9: str(message_id)})
+
     def update_status(self, request_id: str, status: str) -> bool:
         """Update request status."""
         try:
-            cell = self._database_sheet.find(request_id, in_column=1)
-            if cell:
-                self._database_sheet.update_cell(cell.row, 6, status)
-                return True
-            return False
+            return self.update_request(request_id, {6: status})
         except Exception as e:
             print(f"Error updating status: {e}")
             return False
-    
+
+    def approve_request(
+        self,
+        request_id: str,
+        title: str,
+        regent_name: str,
+        file_link: str = "",
+        category: str = "Інші"
+    ) -> bool:
+        """
+        Approve a request and add the song to Repertoire.
+
+        The status change, the file link and the new Repertoire row are
+        written in one local transaction; the sheets receive them later.
+        """
+        try:
+            return bool(self.approve_requests([{
+                "request_id": request_id,
+                "title": title,
+                "regent_name": regent_name,
+                "file_link": file_link,
+                "category": category,
+            }]))
+        except Exception as e:
+            print(f"Error approving request: {e}")
+            return False
+
+    def approve_requests(self, approvals: list[dict]) -> list[str]:
+        """
+        Approve several requests and add their songs to Repertoire in one transaction.
+
+        If GOOGLE_DRIVE_FOLDER_ID is set, the files are also queued for
+        archiving to Drive (see drive_client.DriveArchiver).
+
+        Args:
+            approvals: Dicts with request_id, title, regent_name and optional file_link, category
+
+        Returns:
+            IDs of the approved requests (unknown or already reviewed requests are skipped)
+        """
+        date_added = datetime.now().strftime("%Y-%m-%d")
+        approved = []
+
+        with self._store.transaction():
+            for approval in approvals:
+                request_id = approval["request_id"]
+                row = self._store.get_request(request_id)
+                # Columns: 6=Status
+                if not row or row[5] not in REVIEWABLE_STATUSES:
+                    continue
+
+                file_link = approval.get("file_link") or ""
+                category = approval.get("category") or "Інші"
+
+                # Columns: 6=Status, 12=Link
+                fields = {"status": "approved"}
+                if file_link:
+                    fields["link"] = file_link
+                self._store.update_request(request_id, fields)
+                self._store.insert_song([approval["title"], date_added, approval["regent_name"], file_link, category])
+                # Columns: 8=File ID
+                if GOOGLE_DRIVE_FOLDER_ID and row[7]:
+                    self._store.queue_drive_upload(request_id, row[7], approval["title"])
+                approved.append(request_id)
+
+        if approved:
+            with self._cache_lock:
+                self._title_index = None
+        return approved
+
+    def update_statuses(self, request_ids: list[str], status: str) -> list[str]:
+        """
+        Set the status of several requests in one transaction.
+
+        Returns:
+            IDs of the requests that were found and updated
+        """
+        with self._store.transaction():
+            updated = [
+                request_id for request_id in request_ids
+                if self._store.update_request(request_id, {"status": status})
+            ]
+        with self._cache_lock:
+            self._title_index = None
+        return updated
+
+    def get_pending_requests(self) -> list[dict]:
+        """Get all requests waiting for review, oldest first."""
+        return [dict(zip(DATABASE_HEADERS, row)) for row in self._store.requests_by_status("pending")]
+
     def get_request(self, request_id: str) -> Optional[dict]:
         """Get a request by ID."""
         try:
-            cell = self._database_sheet.find(request_id, in_column=1)
-            if cell:
-                row = self._database_sheet.row_values(cell.row)
-                headers = self._database_sheet.row_values(1)
-                
-                # Pad row if necessary
-                while len(row) < len(headers):
-                    row.append("")
-                
-                return dict(zip(headers, row))
-            return None
+            row = self._store.get_request(request_id)
+            return dict(zip(DATABASE_HEADERS, row)) if row else None
         except Exception as e:
             print(f"Error getting request: {e}")
             return None
-    
+
     def add_to_repertoire(self, title: str, regent_name: str, file_link: str = "", category: str = "Інші") -> bool:
         """Add song to repertoire."""
         try:
             date_added = datetime.now().strftime("%Y-%m-%d")
-            row = [title, date_added, regent_name, file_link, category]
-            self._repertoire_sheet.append_row(row)
+            self._store.insert_song([title, date_added, regent_name, file_link, category])
+            with self._cache_lock:
+                if self._title_index is not None:
+                    self._title_index.add(normalize_title(title), (regent_name or "Невідомо", title, file_link or None))
             return True
         except Exception as e:
             print(f"Error adding to repertoire: {e}")
             return False
-    
+
+    def add_songs(self, songs: list[dict]) -> int:
+        """
+        Add many songs to Repertoire in one transaction (sent to Sheets as one append).
+
+        Args:
+            songs: Dicts with title, regent_name and optional file_link, category
+
+        Returns:
+            Number of songs added
+        """
+        date_added = datetime.now().strftime("%Y-%m-%d")
+        with self._store.transaction():
+            for song in songs:
+                self._store.insert_song([
+                    song["title"],
+                    date_added,
+                    song["regent_name"],
+                    song.get("file_link") or "",
+                    song.get("category") or "Інші",
+                ])
+        with self._cache_lock:
+            self._title_index = None
+        return len(songs)
+
     def get_repertoire(self) -> list[dict]:
-        """Get all songs in repertoire."""
-        try:
-            all_records = self._repertoire_sheet.get_all_records()
-            return all_records
-        except Exception as e:
-            print(f"Error getting repertoire: {e}")
-            return []
+        """Get all songs in repertoire (errors are raised, never an empty list)."""
+        return [dict(zip(REPERTOIRE_HEADERS, row)) for row in self._store.songs() if any(row)]
 
     # --- Regent Management ---
 
     def create_invite_code(self) -> str:
-        """Create a new invite code and add to sheet."""
+        """Create a new invite code."""
         code = secrets.token_hex(4)  # 8 chars
         regent_id = str(uuid.uuid4())
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
+
         # ID, Name, Invite Code, Telegram ID, Username, Status, Created At
         row = [regent_id, "", code, "", "", "pending", timestamp]
-        
-        self._regents_sheet.append_row(row)
+
+        self._store.insert_regent(row)
         return code
 
     def get_regent_by_code(self, code: str) -> Optional[dict]:
         """Find pending regent invite by code."""
         try:
-            cell = self._regents_sheet.find(code, in_column=3)
-            if cell:
-                row = self._regents_sheet.row_values(cell.row)
-                headers = self._regents_sheet.row_values(1)
-                data = dict(zip(headers, row))
-                
-                if data.get("Status") == "pending":
-                    data["_row"] = cell.row  # Internal use
-                    return data
-            return None
+            row = self._store.regent_by("invite_code", code)
+            if not row:
+                return None
+            data = dict(zip(REGENTS_HEADERS, row))
+            return data if data.get("Status") == "pending" else None
         except Exception as e:
             print(f"Error looking up invite code: {e}")
             return None
@@ -266,47 +695,362 @@ class SheetsClient:
         regent = self.get_regent_by_code(code)
         if not regent:
             return False
-            
-        row_idx = regent["_row"]
-        
-        # Update Name, Telegram ID, Username, Status
-        # Columns: 2=Name, 4=Telegram ID, 5=Username, 6=Status
-        self._regents_sheet.update_cell(row_idx, 2, full_name)
-        self._regents_sheet.update_cell(row_idx, 4, str(telegram_id))
-        self._regents_sheet.update_cell(row_idx, 5, username or "")
-        self._regents_sheet.update_cell(row_idx, 6, "active")
-        return True
+
+        updated = self._store.update_regent(regent["ID"], {
+            "name": full_name,
+            "telegram_id": str(telegram_id),
+            "username": username or "",
+            "status": "active",
+        })
+
+        self.invalidate_regent(telegram_id)
+        return updated
 
     def get_all_regents(self) -> list[dict]:
         """Get all active regents."""
         try:
-            all_records = self._regents_sheet.get_all_records()
+            all_records = [dict(zip(REGENTS_HEADERS, row)) for row in self._store.regents()]
             return [r for r in all_records if r.get("Status") == "active"]
         except Exception as e:
             print(f"Error getting regents: {e}")
             return []
-            
+
+    def get_cached_regent(self, telegram_id: int) -> tuple[bool, Optional[dict]]:
+        """
+        Look up a regent in the authorization cache only (never blocks on I/O).
+
+        Returns:
+            Tuple of (found_in_cache, active_regent_record_or_None)
+        """
+        with self._cache_lock:
+            entry = self._auth_cache.get(int(telegram_id))
+        if entry and entry[1] > time.monotonic():
+            return True, entry[0]
+        return False, None
+
+    def get_regent(self, telegram_id: int) -> Optional[dict]:
+        """Get the active regent record for a Telegram user, or None."""
+        found, regent = self.get_cached_regent(telegram_id)
+        if found:
+            return regent
+
+        row = self._store.regent_by("telegram_id", str(telegram_id))
+        regent = dict(zip(REGENTS_HEADERS, row)) if row else None
+        if regent and regent.get("Status") != "active":
+            regent = None
+        with self._cache_lock:
+            self._auth_cache[int(telegram_id)] = (regent, time.monotonic() + AUTH_CACHE_TTL)
+        return regent
+
+    def invalidate_regent(self, telegram_id: Optional[int] = None):
+        """Drop one user (or everyone, if telegram_id is None) from the authorization cache."""
+        with self._cache_lock:
+            if telegram_id is None:
+                self._auth_cache.clear()
+            else:
+                self._auth_cache.pop(int(telegram_id), None)
+
     def is_regent(self, telegram_id: int) -> bool:
         """Check if user is an authorized regent."""
         try:
-            cell = self._regents_sheet.find(str(telegram_id), in_column=4)
-            if cell:
-                status = self._regents_sheet.cell(cell.row, 6).value
-                return status == "active"
-            return False
+            return self.get_regent(telegram_id) is not None
         except Exception as e:
             print(f"Error checking regent status: {e}")
             return False
 
 
-# Singleton instance
+class SheetsMirror:
+    """
+    Background task that keeps Google Sheets in step with the local store.
+
+    Local writes mark the mirror dirty; after SHEETS_MIRROR_DELAY seconds
+    everything queued so far is sent in one batch. When idle, the sheets are
+    checked for manual edits every SHEETS_POLL_INTERVAL seconds, and
+    listeners are told which local tables those edits changed. Failed syncs
+    are retried with a growing pause; the outbox keeps the changes.
+    """
+
+    def __init__(self, sheets: "AsyncSheetsClient", delay: float = SHEETS_MIRROR_DELAY, interval: float = SHEETS_POLL_INTERVAL):
+        """
+        Create the mirror (the task starts on first mark_dirty()).
+
+        Args:
+            sheets: Async client whose store is mirrored
+            delay: Seconds to wait for more writes before syncing
+            interval: Seconds between syncs when nothing was written
+        """
+        self._sheets = sheets
+        self._delay = delay
+        self._interval = interval
+        self._dirty = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: list[Callable[[set[str]], None]] = []
+
+    def add_listener(self, callback: Callable[[set[str]], None]):
+        """
+        Call callback(changed_tables) after manual Sheets edits were applied locally.
+
+        Args:
+            callback: Function taking the set of changed table names (SONGS, REQUESTS, REGENTS)
+        """
+        self._listeners.append(callback)
+
+    def start(self):
+        """Start polling for manual Sheets edits (also done by the first mark_dirty())."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def mark_dirty(self):
+        """Schedule a sync (local data changed)."""
+        self._dirty.set()
+        self.start()
+
+    async def _run(self):
+        """Sync whenever marked dirty (after the delay) or the interval passes."""
+        failures = 0
+        while True:
+            try:
+                await asyncio.wait_for(self._dirty.wait(), timeout=self._interval)
+                await asyncio.sleep(self._delay)
+            except asyncio.TimeoutError:
+                pass
+            self._dirty.clear()
+
+            try:
+                changed = await self._sheets.sync_with_sheets()
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                retry_in = min(self._interval, self._delay * 2 ** failures)
+                print(f"Error syncing Google Sheets (attempt {failures}), retrying in {retry_in:.0f}s: {e}")
+                print(f"Sheets scheduler stats: {self._sheets.sync_client.scheduler.stats()}")
+                self._dirty.set()
+                await asyncio.sleep(retry_in)
+                continue
+
+            if changed:
+                for callback in self._listeners:
+                    try:
+                        callback(changed)
+                    except Exception as e:
+                        print(f"Error in Sheets change listener: {e}")
+
+    async def flush(self):
+        """Stop the task and send whatever is still queued (used on shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        try:
+            await self._sheets.sync_with_sheets(pull=False, priority=INTERACTIVE)
+        except Exception as e:
+            print(f"Error syncing Google Sheets on shutdown (changes stay queued): {e}")
+
+
+class AsyncSheetsClient:
+    """
+    Async facade over SheetsClient.
+
+    Reads and writes go to the local SQLite store and return immediately;
+    only the mirror's Sheets round trips are offloaded to a bounded thread
+    pool and awaited with a timeout, so a slow or unavailable Sheets API
+    never blocks the bot's event loop or the user waiting for an answer.
+    """
+
+    def __init__(self, client: SheetsClient, executor: ThreadPoolExecutor, timeout: float = SHEETS_CALL_TIMEOUT):
+        """Wrap a SheetsClient."""
+        self._client = client
+        self._executor = executor
+        self._timeout = timeout
+        self.mirror = SheetsMirror(self)
+
+    @property
+    def sync_client(self) -> SheetsClient:
+        """The underlying synchronous client."""
+        return self._client
+
+    async def _run(self, func, *args, **kwargs):
+        """Run a blocking call in the executor, raising asyncio.TimeoutError if it takes too long."""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+        return await asyncio.wait_for(future, timeout=self._timeout)
+
+    async def sync_with_sheets(self, pull: bool = True, priority: int = BACKGROUND) -> set[str]:
+        """Bring the sheets up to date with the local store and apply manual edits."""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, partial(self._client.sync_with_sheets, pull, priority))
+        return await asyncio.wait_for(future, timeout=SHEETS_CONNECT_TIMEOUT)
+
+    async def warm_caches(self):
+        """Build the title index and the authorization cache in a worker thread."""
+        await self._run(self._client.warm_caches)
+
+    async def check_duplicate(self, normalized_title: str) -> tuple[bool, Optional[str], Optional[str], Optional[str], bool]:
+        """Check if a song with this title already exists in Repertoire or Database."""
+        return self._client.check_duplicate(normalized_title)
+
+    async def check_duplicates(self, normalized_titles: list[str]) -> list[Optional[TitleMatch]]:
+        """Find the best existing match for many titles in one pass over the index."""
+        return self._client.check_duplicates(normalized_titles)
+
+    async def create_request(self, *args, **kwargs) -> str:
+        """Create a new song request."""
+        request_id = self._client.create_request(*args, **kwargs)
+        self.mirror.mark_dirty()
+        return request_id
+
+    async def find_by_fingerprint(self, file_unique_id: Optional[str] = None, sha256: Optional[str] = None) -> Optional[dict]:
+        """Find an approved or pending request for exactly the same file."""
+        return self._client.find_by_fingerprint(file_unique_id, sha256)
+
+    async def update_message_id(self, request_id: str, message_id: int):
+        """Update the admin message ID for a request."""
+        self._client.update_message_id(request_id, message_id)
+        self.mirror.mark_dirty()
+
+    async def update_status(self, request_id: str, status: str) -> bool:
+        """Update request status."""
+        updated = self._client.update_status(request_id, status)
+        self.mirror.mark_dirty()
+        return updated
+
+    async def approve_request(self, *args, **kwargs) -> bool:
+        """Approve a request and add the song to Repertoire."""
+        approved = self._client.approve_request(*args, **kwargs)
+        self.mirror.mark_dirty()
+        return approved
+
+    async def approve_requests(self, approvals: list[dict]) -> list[str]:
+        """Approve several requests and add their songs to Repertoire in one transaction."""
+        approved = self._client.approve_requests(approvals)
+        self.mirror.mark_dirty()
+        return approved
+
+    async def update_statuses(self, request_ids: list[str], status: str) -> list[str]:
+        """Set the status of several requests in one transaction."""
+        updated = self._client.update_statuses(request_ids, status)
+        self.mirror.mark_dirty()
+        return updated
+
+    async def get_pending_requests(self) -> list[dict]:
+        """Get all requests waiting for review, oldest first."""
+        return self._client.get_pending_requests()
+
+    async def get_request(self, request_id: str) -> Optional[dict]:
+        """Get a request by ID."""
+        return self._client.get_request(request_id)
+
+    async def add_to_repertoire(self, *args, **kwargs) -> bool:
+        """Add song to repertoire."""
+        added = self._client.add_to_repertoire(*args, **kwargs)
+        self.mirror.mark_dirty()
+        return added
+
+    async def add_songs(self, songs: list[dict]) -> int:
+        """Add many songs to Repertoire in one transaction."""
+        added = self._client.add_songs(songs)
+        self.mirror.mark_dirty()
+        return added
+
+    async def get_repertoire(self) -> list[dict]:
+        """Get all songs in repertoire."""
+        return self._client.get_repertoire()
+
+    async def create_invite_code(self) -> str:
+        """Create a new invite code."""
+        code = self._client.create_invite_code()
+        self.mirror.mark_dirty()
+        return code
+
+    async def get_regent_by_code(self, code: str) -> Optional[dict]:
+        """Find pending regent invite by code."""
+        return self._client.get_regent_by_code(code)
+
+    async def register_regent(self, code: str, telegram_id: int, username: str, full_name: str) -> bool:
+        """Register a regent using an invite code."""
+        registered = self._client.register_regent(code, telegram_id, username, full_name)
+        self.mirror.mark_dirty()
+        return registered
+
+    async def get_all_regents(self) -> list[dict]:
+        """Get all active regents."""
+        return self._client.get_all_regents()
+
+    async def is_regent(self, telegram_id: int) -> bool:
+        """Check if user is an authorized regent."""
+        return self._client.is_regent(telegram_id)
+
+
+# Singleton instances
 _sheets_client = None
+_sheets_client_lock = threading.Lock()
+_async_sheets_client = None
+_async_sheets_client_lock = asyncio.Lock()
+_sheets_executor = None
+
 
+def get_sheets_client(connect: bool = True) -> SheetsClient:
+    """
+    Get or create the sheets client singleton.
 
-def get_sheets_client() -> SheetsClient:
-    """Get or create the sheets client singleton."""
+    Args:
+        connect: Also connect to Google Sheets if not connected yet
+    """
     global _sheets_client
-    if _sheets_client is None:
-        _sheets_client = SheetsClient()
-        _sheets_client.connect()
+    with _sheets_client_lock:
+        if _sheets_client is None:
+            _sheets_client = SheetsClient()
+        if connect and not _sheets_client.is_connected:
+            _sheets_client.connect()
     return _sheets_client
+
+
+def _get_sheets_executor() -> ThreadPoolExecutor:
+    """Get or create the thread pool used for blocking Sheets calls."""
+    global _sheets_executor
+    if _sheets_executor is None:
+        _sheets_executor = ThreadPoolExecutor(
+            max_workers=SHEETS_MAX_WORKERS,
+            thread_name_prefix="sheets"
+        )
+    return _sheets_executor
+
+
+async def get_async_sheets_client() -> AsyncSheetsClient:
+    """
+    Get or create the async sheets client singleton without blocking the event loop.
+
+    Sheets is only awaited when the local store is still empty (first run);
+    otherwise the mirror connects in the background and handlers are served
+    from the local store even while Sheets is unavailable.
+    """
+    global _async_sheets_client
+    if _async_sheets_client is not None:
+        return _async_sheets_client
+
+    async with _async_sheets_client_lock:
+        if _async_sheets_client is None:
+            executor = _get_sheets_executor()
+            loop = asyncio.get_running_loop()
+            client = await loop.run_in_executor(executor, partial(get_sheets_client, connect=False))
+            if client.needs_bootstrap():
+                # A user is waiting, so these calls go ahead of background work
+                await asyncio.wait_for(
+                    loop.run_in_executor(executor, partial(client.sync_with_sheets, priority=INTERACTIVE)),
+                    timeout=SHEETS_CONNECT_TIMEOUT
+                )
+            async_client = AsyncSheetsClient(client, executor)
+            async_client.mirror.mark_dirty()  # Connect and send anything left from the last run
+            _async_sheets_client = async_client
+    return _async_sheets_client
+
+
+async def flush_sheets_mirror():
+    """Send queued local changes to Google Sheets (call on shutdown)."""
+    if _async_sheets_client is not None:
+        await _async_sheets_client.mirror.flush()
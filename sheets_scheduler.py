@@ -0,0 +1,206 @@
+"""
+Quota-aware scheduler for Google Sheets API calls.
+
+Every call to Sheets goes through SheetsScheduler.read()/write(). Calls
+take a token from the read or write bucket (sized to the per-minute
+quotas), wait in priority order when the bucket is empty, and are retried
+with exponential backoff and jitter when Google answers 429 (and 5xx for
+reads). A burst therefore makes the sync slower instead of failing it.
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from gspread.exceptions import APIError
+
+# Priorities (lower runs first)
+INTERACTIVE = 0  # A user is waiting (first connect, shutdown flush)
+BACKGROUND = 1  # Mirroring and polling
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# HTTP statuses worth retrying. A write answered with 5xx may still have been
+# applied, and repeating an append would duplicate its rows, so writes are
+# only retried when the quota rejected them.
+RETRY_STATUSES = {
+    "read": {429, 500, 502, 503, 504},
+    "write": {429},
+}
+
+
+def _status_code(error: "APIError") -> int:
+    """Get the HTTP status of a gspread APIError."""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", 0) or getattr(error, "code", 0) or 0
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate."""
+
+    def __init__(self, per_minute: float, capacity: float = None):
+        """
+        Create a full bucket.
+
+        Args:
+            per_minute: Tokens added per minute (the quota)
+            capacity: Maximum burst size (defaults to per_minute)
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self) -> float:
+        """
+        Take a token if one is available.
+
+        Returns:
+            0 if a token was taken, otherwise seconds until the next token
+        """
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class SheetsScheduler:
+    """Rate limits, prioritizes and retries blocking Sheets API calls (thread-safe)."""
+
+    def __init__(
+        self,
+        reads_per_minute: float,
+        writes_per_minute: float,
+        max_retries: int = 5,
+        base_backoff: float = 1.0,
+        max_backoff: float = 32.0,
+    ):
+        """
+        Create the scheduler.
+
+        Args:
+            reads_per_minute: Read quota
+            writes_per_minute: Write quota
+            max_retries: Retries after a retryable status before the error is raised
+            base_backoff: First backoff in seconds (doubled on every retry)
+            max_backoff: Upper bound for a single backoff
+        """
+        self._buckets = {
+            "read": TokenBucket(reads_per_minute),
+            "write": TokenBucket(writes_per_minute),
+        }
+        self._max_retries = max_retries
+        self._base_backoff = base_backoff
+        self._max_backoff = max_backoff
+
+        self._condition = threading.Condition()
+        self._waiting: dict[str, list[tuple[int, int]]] = {"read": [], "write": []}
+        self._tickets = itertools.count()
+        self._local = threading.local()
+
+        # Metrics
+        self._stats = {
+            "calls": 0,
+            "retries": 0,
+            "failures": 0,
+            "throttled": 0,
+            "wait_seconds": 0.0,
+            "max_queue_depth": 0,
+        }
+
+    @contextmanager
+    def priority(self, priority: int):
+        """Run the Sheets calls made by this thread inside the block with the given priority."""
+        previous = getattr(self._local, "priority", BACKGROUND)
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def _acquire(self, kind: str):
+        """Wait for a token; waiters are served by priority, then in arrival order."""
+        priority = getattr(self._local, "priority", BACKGROUND)
+        ticket = (priority, next(self._tickets))
+        queue = self._waiting[kind]
+        started = time.monotonic()
+        with self._condition:
+            heapq.heappush(queue, ticket)
+            depth = len(self._waiting["read"]) + len(self._waiting["write"])
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], depth)
+            throttled = False
+            try:
+                while True:
+                    if queue[0] == ticket:
+                        wait = self._buckets[kind].try_take()
+                        if not wait:
+                            break
+                        throttled = True
+                    else:
+                        wait = None  # Someone with a better ticket goes first
+                    self._condition.wait(timeout=wait)
+            finally:
+                queue.remove(ticket)
+                heapq.heapify(queue)
+                self._condition.notify_all()
+            if throttled:
+                self._stats["throttled"] += 1
+            self._stats["wait_seconds"] += time.monotonic() - started
+
+    def _call(self, kind: str, func, *args, **kwargs):
+        """Run func under the kind's quota, retrying the kind's RETRY_STATUSES."""
+        from gspread.exceptions import APIError  # Loaded with the first call, not at startup
+
+        attempt = 0
+        while True:
+            self._acquire(kind)
+            with self._condition:
+                self._stats["calls"] += 1
+            try:
+                return func(*args, **kwargs)
+            except APIError as e:
+                if _status_code(e) not in RETRY_STATUSES[kind] or attempt >= self._max_retries:
+                    with self._condition:
+                        self._stats["failures"] += 1
+                    raise
+                # Full jitter: spread retries of concurrent callers apart
+                delay = random.uniform(0, min(self._max_backoff, self._base_backoff * 2 ** attempt))
+                attempt += 1
+                with self._condition:
+                    self._stats["retries"] += 1
+                print(f"Sheets API returned {_status_code(e)}, retry {attempt} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def read(self, func, *args, **kwargs):
+        """Run a read call (values/metadata lookups)."""
+        return self._call("read", func, *args, **kwargs)
+
+    def write(self, func, *args, **kwargs):
+        """Run a write call (appends, updates, sheet creation)."""
+        return self._call("write", func, *args, **kwargs)
+
+    def stats(self) -> dict:
+        """
+        Get scheduler metrics.
+
+        Returns:
+            Counters plus the current queue depth per kind and priority
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            for kind, queue in self._waiting.items():
+                stats[f"{kind}_queue_depth"] = len(queue)
+                for priority, name in PRIORITY_NAMES.items():
+                    stats[f"{kind}_queue_{name}"] = sum(1 for p, _ in queue if p == priority)
+        return stats
@@ -0,0 +1,275 @@
+"""
+SQLite-backed persistence for python-telegram-bot.
+
+Unlike PicklePersistence, which rewrites one pickle with all user_data,
+chat_data, bot_data and conversations on every flush, this stores each
+user, chat and conversation key in its own row and writes only rows whose
+content actually changed.
+"""
+
+import json
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+from typing import Any, Optional
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (
+    user_id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chat_data (
+    chat_id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS kv (
+    name TEXT PRIMARY KEY,  -- 'bot_data' or 'callback_data'
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,  -- JSON list, e.g. [chat_id, user_id]
+    state BLOB NOT NULL,
+    PRIMARY KEY (name, key)
+);
+"""
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+    """Unpickler for PicklePersistence files (Bot references are dropped)."""
+
+    def persistent_load(self, pid):
+        return None
+
+
+class SQLitePersistence(BasePersistence):
+    """Persistence that keeps bot data in an SQLite database (WAL mode)."""
+
+    def __init__(
+        self,
+        filepath: str,
+        legacy_pickle_path: Optional[str] = None,
+        store_data: Optional[PersistenceInput] = None,
+        update_interval: float = 60,
+    ):
+        """
+        Open (or create) the database.
+
+        Args:
+            filepath: Path to the SQLite database file
+            legacy_pickle_path: PicklePersistence file to import once if the database is new
+            store_data: Which kinds of data to store (all by default)
+            update_interval: Seconds between persistence updates
+        """
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.filepath = filepath
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filepath, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        # Digest of the last written blob per row, to skip unchanged writes
+        self._digests: dict[tuple, bytes] = {}
+
+        if legacy_pickle_path and self._is_empty() and os.path.exists(legacy_pickle_path):
+            self.migrate_from_pickle(legacy_pickle_path)
+
+    # --- Helpers ---
+
+    @staticmethod
+    def _dump(obj: Any) -> bytes:
+        return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(blob: bytes) -> Any:
+        return pickle.loads(blob)
+
+    @staticmethod
+    def _digest(blob: bytes) -> bytes:
+        return hashlib.blake2b(blob, digest_size=16).digest()
+
+    def _remember(self, row_key: tuple, blob: bytes):
+        """Record the digest of a blob that is known to be in the database."""
+        self._digests[row_key] = self._digest(blob)
+
+    def _execute(self, sql: str, params: tuple = ()):
+        """Run one write statement in its own transaction."""
+        with self._lock, self._conn:
+            self._conn.execute(sql, params)
+
+    def _write_if_changed(self, row_key: tuple, blob: bytes, sql: str, params: tuple):
+        """Run the write only if the blob differs from what was last stored for row_key."""
+        digest = self._digest(blob)
+        if self._digests.get(row_key) == digest:
+            return
+        self._execute(sql, params)
+        self._digests[row_key] = digest
+
+    def _is_empty(self) -> bool:
+        with self._lock:
+            for table in ("user_data", "chat_data", "kv", "conversations"):
+                if self._conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                    return False
+        return True
+
+    def migrate_from_pickle(self, pickle_path: str):
+        """Import data from a single-file PicklePersistence file."""
+        try:
+            with open(pickle_path, "rb") as f:
+                data = _LegacyUnpickler(f).load()
+        except Exception as e:
+            logger.error(f"Could not read legacy persistence file {pickle_path}: {e}")
+            return
+
+        with self._lock, self._conn:
+            for user_id, user_data in (data.get("user_data") or {}).items():
+                user_data.pop("file_bytes", None)  # Never needed (see handle_document)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO user_data (user_id, data) VALUES (?, ?)",
+                    (user_id, self._dump(user_data))
+                )
+            for chat_id, chat_data in (data.get("chat_data") or {}).items():
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO chat_data (chat_id, data) VALUES (?, ?)",
+                    (chat_id, self._dump(chat_data))
+                )
+            for name in ("bot_data", "callback_data"):
+                if data.get(name) is not None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO kv (name, data) VALUES (?, ?)",
+                        (name, self._dump(data[name]))
+                    )
+            for name, conversation in (data.get("conversations") or {}).items():
+                for key, state in conversation.items():
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)",
+                        (name, json.dumps(list(key)), self._dump(state))
+                    )
+        logger.info(f"Migrated persistence data from {pickle_path} to {self.filepath}")
+
+    # --- Loading ---
+
+    async def get_user_data(self) -> dict[int, dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT user_id, data FROM user_data").fetchall()
+        result = {}
+        for user_id, blob in rows:
+            self._remember(("user", user_id), blob)
+            result[user_id] = self._load(blob)
+        return result
+
+    async def get_chat_data(self) -> dict[int, dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT chat_id, data FROM chat_data").fetchall()
+        result = {}
+        for chat_id, blob in rows:
+            self._remember(("chat", chat_id), blob)
+            result[chat_id] = self._load(blob)
+        return result
+
+    def _get_kv(self, name: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM kv WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        self._remember(("kv", name), row[0])
+        return self._load(row[0])
+
+    async def get_bot_data(self) -> dict:
+        data = self._get_kv("bot_data")
+        return data if data is not None else {}
+
+    async def get_callback_data(self):
+        return self._get_kv("callback_data")
+
+    async def get_conversations(self, name: str) -> dict:
+        """Load the states of one ConversationHandler (only when that handler asks)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, state FROM conversations WHERE name = ?", (name,)
+            ).fetchall()
+        result = {}
+        for key, blob in rows:
+            self._remember(("conv", name, key), blob)
+            result[tuple(json.loads(key))] = self._load(blob)
+        return result
+
+    # --- Updating (only changed rows are written) ---
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        blob = self._dump(data)
+        self._write_if_changed(
+            ("user", user_id), blob,
+            "INSERT OR REPLACE INTO user_data (user_id, data) VALUES (?, ?)",
+            (user_id, blob)
+        )
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        blob = self._dump(data)
+        self._write_if_changed(
+            ("chat", chat_id), blob,
+            "INSERT OR REPLACE INTO chat_data (chat_id, data) VALUES (?, ?)",
+            (chat_id, blob)
+        )
+
+    def _update_kv(self, name: str, data: Any):
+        blob = self._dump(data)
+        self._write_if_changed(
+            ("kv", name), blob,
+            "INSERT OR REPLACE INTO kv (name, data) VALUES (?, ?)",
+            (name, blob)
+        )
+
+    async def update_bot_data(self, data: dict) -> None:
+        self._update_kv("bot_data", data)
+
+    async def update_callback_data(self, data) -> None:
+        self._update_kv("callback_data", data)
+
+    async def update_conversation(self, name: str, key: tuple, new_state: Optional[object]) -> None:
+        key_json = json.dumps(list(key))
+        row_key = ("conv", name, key_json)
+        if new_state is None:
+            self._digests.pop(row_key, None)
+            self._execute("DELETE FROM conversations WHERE name = ? AND key = ?", (name, key_json))
+            return
+        blob = self._dump(new_state)
+        self._write_if_changed(
+            row_key, blob,
+            "INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)",
+            (name, key_json, blob)
+        )
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._digests.pop(("user", user_id), None)
+        self._execute("DELETE FROM user_data WHERE user_id = ?", (user_id,))
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._digests.pop(("chat", chat_id), None)
+        self._execute("DELETE FROM chat_data WHERE chat_id = ?", (chat_id,))
+
+    # Data lives in memory in the Application; nothing to refresh from the database
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def flush(self) -> None:
+        """Checkpoint the WAL and close the database."""
+        with self._lock:
+            try:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                self._conn.close()
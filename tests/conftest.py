@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules live in the repository root (run pytest from there)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,83 @@
+"""Tests for batch review (/review) of song requests."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from handlers import admin
+from sheets_client import AsyncSheetsClient, SheetsClient
+
+
+@pytest.fixture
+def sheets(tmp_path):
+    """Async client over a local store with one approved, one rejected and one pending request."""
+    client = SheetsClient(str(tmp_path / "store.sqlite3"))
+    ids = {}
+    for status in ("approved", "rejected", "pending"):
+        ids[status] = client.create_request(f"Пісня {status}", f"пісня {status}", 100, "ivan", "file", status=status)
+    async_client = AsyncSheetsClient(client, ThreadPoolExecutor(max_workers=1))
+    async_client.mirror = MagicMock()  # No Google Sheets in tests
+    with patch("handlers.admin.get_async_sheets_client", AsyncMock(return_value=async_client)), \
+            patch("handlers.admin.request_repertoire_update"):
+        yield client, ids
+
+
+def run_batch(action, request_ids):
+    query = AsyncMock()
+    context = MagicMock()
+    context.bot = AsyncMock()
+    tasks = []
+    context.application.create_task = lambda coroutine: tasks.append(asyncio.ensure_future(coroutine))
+
+    async def run():
+        await action(query, context, request_ids)
+        await asyncio.gather(*tasks)  # Background work started by the action
+
+    asyncio.run(run())
+    notified = [call.kwargs["chat_id"] for call in context.bot.send_message.await_args_list]
+    return query.edit_message_text.await_args.args[0], notified
+
+
+def status(client, request_id):
+    return client.get_request(request_id)["Статус"]
+
+
+def test_approve_selected_only_approves_pending(sheets):
+    client, ids = sheets
+
+    summary, notified = run_batch(admin.approve_selected, list(ids.values()))
+
+    assert summary.startswith("✅ Підтверджено заявок: 1")
+    assert notified == [100]
+    assert {name: status(client, request_id) for name, request_id in ids.items()} == {
+        "approved": "approved", "rejected": "rejected", "pending": "approved"
+    }
+    assert [song[0] for song in client.store.songs()] == ["Пісня pending"]
+    assert admin._approving == set()  # Claims released once the batch is done
+
+
+def test_reject_selected_only_rejects_pending(sheets):
+    client, ids = sheets
+
+    summary, notified = run_batch(admin.reject_selected, list(ids.values()))
+
+    assert summary.startswith("❌ Відхилено заявок: 1")
+    assert notified == [100]
+    assert {name: status(client, request_id) for name, request_id in ids.items()} == {
+        "approved": "approved", "rejected": "rejected", "pending": "rejected"
+    }
+
+
+def test_approval_in_progress_is_not_rejected(sheets):
+    client, ids = sheets
+    admin._approving.add(ids["pending"])
+    try:
+        summary, notified = run_batch(admin.reject_selected, [ids["pending"]])
+    finally:
+        admin._approving.discard(ids["pending"])
+
+    assert summary.startswith("❌ Відхилено заявок: 0")
+    assert notified == []
+    assert status(client, ids["pending"]) == "pending"
@@ -0,0 +1,34 @@
+"""Tests for recognizing re-uploaded files by content."""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from handlers import document
+
+
+def test_content_check_runs_in_background_and_keeps_the_hash():
+    earlier = {"ID": "abc", "Статус": "approved"}
+    sheets = MagicMock()
+    sheets.find_by_fingerprint = AsyncMock(return_value=earlier)
+    context = SimpleNamespace(user_data={})
+    upload = SimpleNamespace(file_id="file-2", file_size=100)
+
+    async def run():
+        with patch("handlers.document.hash_telegram_file", AsyncMock(return_value="f00d")), \
+                patch("handlers.document.get_async_sheets_client", AsyncMock(return_value=sheets)):
+            document.start_content_check(context, 7, upload)
+            assert 7 in document._content_checks  # Not awaited by the handler
+            return await document.finish_content_check(context, 7)
+
+    assert asyncio.run(run()) == earlier
+    sheets.find_by_fingerprint.assert_awaited_once_with(sha256="f00d")
+    assert context.user_data["sha256"] == "f00d"
+    assert 7 not in document._content_checks
+
+
+def test_finish_content_check_without_a_check():
+    context = SimpleNamespace(user_data={})
+
+    assert asyncio.run(document.finish_content_check(context, 8)) is None
+    assert "sha256" not in context.user_data
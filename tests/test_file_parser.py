@@ -0,0 +1,37 @@
+"""Tests for the parsing service (worker processes)."""
+
+import asyncio
+import time
+
+import pytest
+
+import file_parser
+from benchmarks.bench_parsing import make_pdf
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    file_parser._parse_slots = None  # Bound to the event loop of one test
+    yield
+    file_parser.shutdown_parse_pool()
+
+
+def test_parse_title_async_reads_first_page():
+    pdf = make_pdf(pages=3)
+
+    assert asyncio.run(file_parser.parse_title_async(pdf, "song.pdf")) == "Song title 0"
+
+
+def test_hung_parse_times_out_and_its_worker_is_killed():
+    async def run():
+        await file_parser._run_in_parse_pool(abs, 1, timeout=30)  # Start the workers
+        _, context = file_parser._get_parse_pool()
+        with pytest.raises(asyncio.TimeoutError):
+            await file_parser._run_in_parse_pool(time.sleep, 60, timeout=0.5)
+        return context
+
+    context = asyncio.run(run())
+    for process in context.processes:
+        process.join(timeout=5)
+        assert not process.is_alive()
+    assert file_parser._parse_pool is None
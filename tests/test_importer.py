@@ -0,0 +1,61 @@
+"""Tests for reading /import archives and the import report."""
+
+import asyncio
+import io
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from handlers import importer
+from handlers.importer import read_archive
+from sheets_client import AsyncSheetsClient, SheetsClient
+
+
+def make_zip(entries: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for path, content in entries.items():
+            archive.writestr(path, content)
+    return buffer.getvalue()
+
+
+def test_read_archive_stops_at_total_size():
+    # Highly compressible entries: the archive is small, the content is not
+    archive = make_zip({f"Літургія/{i}.pdf": b"%PDF" + b"0" * 100_000 for i in range(10)})
+    assert len(archive) < 100_000
+
+    files, skipped = read_archive(archive, max_total=250_000)
+
+    assert [path for path, _ in files] == ["Літургія/0.pdf", "Літургія/1.pdf"]
+    assert len(skipped) == 1 and skipped[0].startswith("Літургія/2.pdf")
+
+
+def test_read_archive_skips_other_formats():
+    files, skipped = read_archive(make_zip({"song.docx": b"PK", "notes.txt": b"x"}))
+
+    assert [path for path, _ in files] == ["song.docx"]
+    assert skipped == ["notes.txt (формат)"]
+
+
+def test_failed_uploads_are_not_imported(tmp_path):
+    client = SheetsClient(str(tmp_path / "store.sqlite3"))
+    sheets = AsyncSheetsClient(client, ThreadPoolExecutor(max_workers=1))
+    sheets.mirror = MagicMock()  # No Google Sheets in tests
+    archive = make_zip({"Отче наш.pdf": b"%PDF1", "Богородице Діво.pdf": b"%PDF2"})
+
+    async def upload(context, document, title, username):
+        return "https://t.me/c/1/2" if title == "Отче наш" else None
+
+    with patch.object(importer, "get_async_sheets_client", AsyncMock(return_value=sheets)), \
+            patch.object(importer, "fetch_file_bytes", AsyncMock(return_value=archive)), \
+            patch.object(importer, "parse_title_async", AsyncMock(return_value=None)), \
+            patch.object(importer, "upload_to_storage", upload), \
+            patch.object(importer, "STORAGE_CHANNEL_ID", "-1001"), \
+            patch.object(importer, "request_repertoire_update"):
+        report = asyncio.run(importer.import_files(
+            MagicMock(), AsyncMock(), [{"file_id": "zip", "file_name": "songs.zip"}], "ivan"
+        ))
+
+    assert report.startswith("✅ Імпортовано пісень: 1")
+    assert "Не вдалося завантажити в канал (не додано): 1\n• Богородице Діво" in report
+    assert [song[0] for song in client.store.songs()] == ["Отче наш"]
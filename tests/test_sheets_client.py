@@ -0,0 +1,158 @@
+"""Tests for SheetsClient against a fake spreadsheet (no network)."""
+
+from unittest.mock import MagicMock, patch
+
+import gspread
+import pytest
+
+from config import GOOGLE_SHEET_ID, SHEET_REPERTOIRE, SHEET_DATABASE, SHEET_REGENTS
+from local_store import REPERTOIRE_HEADERS, DATABASE_HEADERS, REGENTS_HEADERS
+from sheets_client import SheetsClient
+
+
+class FakeSpreadsheet:
+    """The spreadsheet calls SheetsClient makes, backed by lists of rows."""
+
+    def __init__(self):
+        self.values = {
+            SHEET_REPERTOIRE: [REPERTOIRE_HEADERS, ["Отче наш", "Літургія", "Іван", ""]],
+            SHEET_DATABASE: [DATABASE_HEADERS],
+            SHEET_REGENTS: [REGENTS_HEADERS],
+        }
+        self.revision = "2024-01-01T00:00:00.000Z"
+        self.batch_gets = 0
+        self._worksheets = []
+        for title in self.values:
+            sheet = MagicMock()
+            sheet.title = title
+            sheet.append_rows.side_effect = lambda rows, title=title: self._append(title, rows)
+            self._worksheets.append(sheet)
+
+    def _append(self, title: str, rows: list) -> dict:
+        start = len(self.values[title]) + 1
+        self.values[title].extend(rows)
+        self.revision += "+"
+        return {"updates": {"updatedRange": f"'{title}'!A{start}:P{start + len(rows) - 1}"}}
+
+    def worksheets(self):
+        return list(self._worksheets)
+
+    def values_batch_get(self, ranges):
+        value_ranges = []
+        for name in ranges:
+            title, _, cells = name.partition("!")
+            values = self.values[title.strip("'")]
+            if cells == "1:1":
+                values = values[:1]
+            else:
+                self.batch_gets += 1
+            value_ranges.append({"values": [list(row) for row in values]})
+        return {"valueRanges": value_ranges}
+
+    def values_batch_update(self, body):
+        for item in body["data"]:
+            title, _, cells = item["range"].partition("!")
+            row_number = int("".join(c for c in cells.split(":")[0] if c.isdigit()))
+            self.values[title.strip("'")][row_number - 1] = item["values"][0]
+        self.revision += "+"
+
+    def get_lastUpdateTime(self):
+        return self.revision
+
+
+@pytest.fixture
+def spreadsheet():
+    return FakeSpreadsheet()
+
+
+@pytest.fixture
+def connected(tmp_path, spreadsheet):
+    """A SheetsClient connected to the fake spreadsheet through the shared session."""
+    session = MagicMock()
+    with patch("sheets_client.get_credentials", return_value=MagicMock()), \
+            patch("sheets_client.get_session", return_value=session), \
+            patch.object(gspread.Client, "open_by_key", return_value=spreadsheet) as open_by_key:
+        client = SheetsClient(str(tmp_path / "store.sqlite3"))
+        client.connect()
+    return client, session, open_by_key
+
+
+def test_connect_uses_shared_session(connected, spreadsheet):
+    client, session, open_by_key = connected
+
+    open_by_key.assert_called_once_with(GOOGLE_SHEET_ID)
+    assert client.is_connected
+    assert client._client.http_client.session is session
+    assert [row[0] for row in client._store.songs()] == ["Отче наш"]
+
+
+
+def test_own_writes_do_not_trigger_a_pull(connected, spreadsheet):
+    client, _, _ = connected
+    downloads = spreadsheet.batch_gets
+
+    client.create_request("Херувимська", "херувимська", 1, "ivan", "file-1")
+    client.sync_with_sheets()
+
+    assert len(spreadsheet.values[SHEET_DATABASE]) == 2
+    assert spreadsheet.batch_gets == downloads
+
+
+def test_edit_during_own_writes_is_pulled_next_time(connected, spreadsheet):
+    client, _, _ = connected
+    client.create_request("Херувимська", "херувимська", 1, "ivan", "file-1")
+    client.sync_with_sheets()
+
+    # An edit that landed while we were writing: covered by the adopted revision
+    spreadsheet.values[SHEET_REPERTOIRE].append(["Богородице Діво", "Всенічна", "Петро", ""])
+
+    assert client.sync_with_sheets()
+    assert [row[0] for row in client._store.songs()] == ["Отче наш", "Богородице Діво"]
+
+    downloads = spreadsheet.batch_gets
+    client.sync_with_sheets()
+    assert spreadsheet.batch_gets == downloads  # Back to revision checks only
+
+
+def test_manual_edit_is_pulled(connected, spreadsheet):
+    client, _, _ = connected
+
+    spreadsheet.values[SHEET_REPERTOIRE].append(["Богородице Діво", "Всенічна", "Петро", ""])
+    spreadsheet.revision += "manual"
+
+    assert client.sync_with_sheets()
+    assert [row[0] for row in client._store.songs()] == ["Отче наш", "Богородице Діво"]
+
+
+def test_manual_edit_is_pulled_after_own_writes(connected, spreadsheet):
+    client, _, _ = connected
+
+    spreadsheet.values[SHEET_REPERTOIRE].append(["Богородице Діво", "Всенічна", "Петро", ""])
+    spreadsheet.revision += "manual"
+    client.create_request("Херувимська", "херувимська", 1, "ivan", "file-1")
+
+    assert client.sync_with_sheets()
+    assert [row[0] for row in client._store.songs()] == ["Отче наш", "Богородице Діво"]
+
+
+def test_approval_appends_the_song_with_its_link(connected, spreadsheet):
+    client, _, _ = connected
+    spreadsheet.values[SHEET_REPERTOIRE].insert(1, ["", "", "", ""])  # Blank row left by hand
+    request_id = client.create_request("Херувимська", "херувимська", 1, "ivan", "file-1")
+    assert client.approve_request(request_id, "Херувимська", "ivan", "https://t.me/c/1/2")
+    assert not client.approve_request(request_id, "Херувимська", "ivan", "https://t.me/c/1/2")
+    client.sync_with_sheets()
+
+    songs = spreadsheet.values[SHEET_REPERTOIRE][1:]
+    assert songs[1][0] == "Отче наш"
+    assert (songs[2][0], songs[2][2], songs[2][3]) == ("Херувимська", "ivan", "https://t.me/c/1/2")
+    assert spreadsheet.values[SHEET_DATABASE][1][11] == "https://t.me/c/1/2"
+
+
+def test_request_under_clarification_is_found_by_fingerprint(tmp_path):
+    client = SheetsClient(str(tmp_path / "store.sqlite3"))
+    client.create_request("Херувимська", "херувимська", 1, "ivan", "file-1", status="clarifying", sha256="f00d")
+    client.create_request("Ангел вопіяше", "ангел вопіяше", 1, "ivan", "file-2", status="rejected", sha256="beef")
+
+    assert client.find_by_fingerprint(sha256="f00d")["Назва"] == "Херувимська"
+    assert client.find_by_fingerprint(sha256="beef") is None
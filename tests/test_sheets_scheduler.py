@@ -0,0 +1,44 @@
+"""Tests for retries in the Sheets API scheduler."""
+
+from unittest.mock import MagicMock
+
+import pytest
+from gspread.exceptions import APIError
+
+from sheets_scheduler import SheetsScheduler
+
+
+def api_error(status: int) -> APIError:
+    response = MagicMock(status_code=status)
+    response.json.return_value = {"error": {"code": status, "message": "error", "status": "ERROR"}}
+    return APIError(response)
+
+
+def failing_once(status: int):
+    return MagicMock(side_effect=[api_error(status), "ok"])
+
+
+def scheduler():
+    return SheetsScheduler(reads_per_minute=600, writes_per_minute=600, base_backoff=0)
+
+
+def test_read_retries_server_errors():
+    call = failing_once(503)
+
+    assert scheduler().read(call) == "ok"
+    assert call.call_count == 2
+
+
+def test_write_is_not_repeated_after_server_error():
+    call = failing_once(503)  # The append may have been applied
+
+    with pytest.raises(APIError):
+        scheduler().write(call)
+    assert call.call_count == 1
+
+
+def test_write_retries_quota_errors():
+    call = failing_once(429)
+
+    assert scheduler().write(call) == "ok"
+    assert call.call_count == 2
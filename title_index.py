@@ -0,0 +1,135 @@
+"""
+Fuzzy title index for duplicate detection.
+
+Titles are split into character trigrams and kept in an inverted index.
+A lookup collects candidates that share trigrams with the query, prunes
+them with cheap bounds and scores only the shortlist with SequenceMatcher.
+"""
+
+from difflib import SequenceMatcher
+from typing import Any, NamedTuple, Optional
+
+# Default similarity threshold (same scale as SequenceMatcher.ratio)
+SIMILARITY_THRESHOLD = 0.75
+
+# How many candidates (best trigram overlap first) get an exact score
+SHORTLIST_SIZE = 50
+
+
+class TitleMatch(NamedTuple):
+    """A title found in the index."""
+    score: float
+    title: str  # Normalized title
+    payload: Any
+
+
+def _trigrams(text: str) -> set[str]:
+    """Split text into a set of character trigrams (padded with spaces)."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """Trigram inverted index over normalized titles."""
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._titles: list[str] = []
+        self._payloads: list[Any] = []
+        self._gram_counts: list[int] = []
+        self._postings: dict[str, list[int]] = {}
+        self._exact: dict[str, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def add(self, normalized_title: str, payload: Any = None):
+        """
+        Add a title to the index.
+
+        Args:
+            normalized_title: Title as returned by normalize_title()
+            payload: Any data to return with matches
+        """
+        if not normalized_title:
+            return
+        entry_id = len(self._titles)
+        grams = _trigrams(normalized_title)
+        self._titles.append(normalized_title)
+        self._payloads.append(payload)
+        self._gram_counts.append(len(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(entry_id)
+        self._exact.setdefault(normalized_title, []).append(entry_id)
+
+    def search(
+        self,
+        normalized_title: str,
+        limit: int = 5,
+        threshold: float = SIMILARITY_THRESHOLD
+    ) -> list[TitleMatch]:
+        """
+        Find the best matching titles.
+
+        Args:
+            normalized_title: Title as returned by normalize_title()
+            limit: Maximum number of matches to return
+            threshold: Minimum similarity score (0..1)
+
+        Returns:
+            Matches sorted by score (best first); exact matches score 1.0.
+            Entries added earlier win ties.
+        """
+        if not normalized_title or not self._titles:
+            return []
+
+        scored: dict[int, float] = {
+            entry_id: 1.0 for entry_id in self._exact.get(normalized_title, [])
+        }
+
+        # Count shared trigrams per candidate
+        query_grams = _trigrams(normalized_title)
+        shared: dict[int, int] = {}
+        for gram in query_grams:
+            for entry_id in self._postings.get(gram, ()):
+                shared[entry_id] = shared.get(entry_id, 0) + 1
+
+        query_len = len(normalized_title)
+        candidates = []
+        for entry_id, count in shared.items():
+            if entry_id in scored:
+                continue
+            # SequenceMatcher.ratio() can never exceed this length bound
+            title_len = len(self._titles[entry_id])
+            if 2 * min(query_len, title_len) / (query_len + title_len) < threshold:
+                continue
+            dice = 2 * count / (len(query_grams) + self._gram_counts[entry_id])
+            candidates.append((dice, entry_id))
+
+        candidates.sort(key=lambda item: (-item[0], item[1]))
+        for _, entry_id in candidates[:SHORTLIST_SIZE]:
+            matcher = SequenceMatcher(None, normalized_title, self._titles[entry_id])
+            if matcher.quick_ratio() < threshold:
+                continue
+            score = matcher.ratio()
+            if score >= threshold:
+                scored[entry_id] = score
+
+        ranked = sorted(scored.items(), key=lambda item: (-item[1], item[0]))
+
+        matches = []
+        seen_titles = set()
+        for entry_id, score in ranked:
+            title = self._titles[entry_id]
+            if title in seen_titles:
+                continue
+            seen_titles.add(title)
+            matches.append(TitleMatch(score, title, self._payloads[entry_id]))
+            if len(matches) >= limit:
+                break
+        return matches
+
+    def best(self, normalized_title: str, threshold: float = SIMILARITY_THRESHOLD) -> Optional[TitleMatch]:
+        """Get the single best match or None."""
+        matches = self.search(normalized_title, limit=1, threshold=threshold)
+        return matches[0] if matches else None
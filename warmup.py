@@ -0,0 +1,148 @@
+"""
+Startup warm-up of the local store, the Google clients and the caches.
+
+bot.post_init calls start_warm_up(), which runs the steps concurrently in
+the background so the bot starts answering at once:
+
+    store   open the local store (loaded from Sheets on the first run),
+            build the title index and the authorization cache
+    sheets  connect to Google Sheets and send changes left from the last run
+    drive   load the shared credentials and start the Drive archive
+
+Each step marks its component ready or failed. Handlers call
+wait_until_ready() before touching the store, so a regent who writes
+during a restart waits for the warm-up instead of racing it.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from telegram import Bot
+
+from config import WARMUP_WAIT_TIMEOUT
+from drive_client import get_drive_client, start_drive_archiver
+from local_store import SONGS
+from repertoire_list import request_repertoire_update
+from sheets_client import get_async_sheets_client
+from sheets_scheduler import INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+# Components
+STORE = "store"
+SHEETS = "sheets"
+DRIVE = "drive"
+
+
+class Readiness:
+    """Startup state of one component: pending, ready or failed."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.error: Optional[BaseException] = None
+        self._done = asyncio.Event()
+
+    def set_ready(self):
+        """Mark the warm-up step as done."""
+        self._done.set()
+
+    def set_failed(self, error: BaseException):
+        """Mark the warm-up step as failed (callers fall back to the cold path)."""
+        self.error = error
+        self._done.set()
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the warm-up step to finish.
+
+        Returns:
+            True if the component is ready, False if it failed or timeout passed
+        """
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return self.error is None
+
+
+_components = {name: Readiness(name) for name in (STORE, SHEETS, DRIVE)}
+_warm_up_task: Optional[asyncio.Task] = None
+
+
+async def wait_until_ready(component: str = STORE, timeout: float = WARMUP_WAIT_TIMEOUT) -> bool:
+    """
+    Wait until a component is warmed up (returns at once if no warm-up was started).
+
+    Returns:
+        True if ready; False if its warm-up failed or is still running after timeout,
+        in which case the caller continues on the cold path
+    """
+    if _warm_up_task is None:
+        return True
+    return await _components[component].wait(timeout)
+
+
+async def _run_step(component: str, step: Callable[[], Awaitable[None]]):
+    """Run one warm-up step and record its outcome."""
+    started = time.monotonic()
+    try:
+        await step()
+    except Exception as e:
+        _components[component].set_failed(e)
+        logger.error(f"Warm-up of {component} failed: {e}")
+    else:
+        _components[component].set_ready()
+        logger.info(f"Warm-up of {component} done in {time.monotonic() - started:.1f}s")
+
+
+async def _warm_store(bot: Bot):
+    """Open the local store and build the caches handlers read from."""
+    sheets = await get_async_sheets_client()
+    await sheets.warm_caches()
+
+    # Republish the repertoire list when songs are edited by hand in Sheets
+    def on_sheet_changes(changed):
+        if SONGS in changed:
+            request_repertoire_update(bot)
+
+    sheets.mirror.add_listener(on_sheet_changes)
+
+
+async def _warm_sheets(bot: Bot):
+    """Connect to Google Sheets, send what is left in the outbox and pull manual edits."""
+    sheets = await get_async_sheets_client()
+    changed = await sheets.sync_with_sheets(priority=INTERACTIVE)
+    if SONGS in changed:
+        request_repertoire_update(bot)
+    sheets.mirror.start()
+
+
+async def _warm_drive(bot: Bot):
+    """Load the credentials and resume the Drive archive (if configured)."""
+    loop = asyncio.get_running_loop()
+    drive = await loop.run_in_executor(None, get_drive_client)
+    if not drive.is_enabled:
+        return
+    if not await _components[STORE].wait():
+        raise RuntimeError("local store is not available")
+    sheets = await get_async_sheets_client()
+    start_drive_archiver(bot, sheets.sync_client.store)
+
+
+async def warm_up(bot: Bot):
+    """Warm up all components concurrently."""
+    await asyncio.gather(
+        _run_step(STORE, lambda: _warm_store(bot)),
+        _run_step(SHEETS, lambda: _warm_sheets(bot)),
+        _run_step(DRIVE, lambda: _warm_drive(bot)),
+    )
+
+
+def start_warm_up(bot: Bot) -> asyncio.Task:
+    """Start the warm-up in the background (call from post_init)."""
+    global _warm_up_task
+    if _warm_up_task is None:
+        _warm_up_task = asyncio.get_running_loop().create_task(warm_up(bot))
+    return _warm_up_task